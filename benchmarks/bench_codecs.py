@@ -0,0 +1,97 @@
+"""
+Offline benchmark of the Redis value codecs.
+
+Payloads are built by parsing the pages in benchmarks/fixtures, the way
+they end up in Redis: a parsed profile, the users of a scheduled search
+and a chat list. Every codec is reported with the stored size (including
+the codec header) and encode/decode throughput. Codecs whose optional
+package (msgpack, zstandard) is missing are skipped.
+
+    python -m benchmarks.bench_codecs
+"""
+import argparse
+import sys
+import time
+
+from interpals_api.api import Api
+from interpals_api.parsers.chat_parser import ChatParser
+from interpals_api.parsers.profile_parser import ProfileParser
+from interpals_api.store.codecs import (CodecRegistry, JsonCodec, MsgpackCodec,
+                                        ZlibCodec, ZstdCodec)
+
+from .bench_parsers import load_fixture
+
+# Users per scheduled search result, as with the default SearchOptions.limit
+SEARCH_RESULT_USERS = 1000
+
+CODECS = [
+    ('json', JsonCodec),
+    ('zlib+json', lambda: ZlibCodec(JsonCodec())),
+    ('zstd+json', lambda: ZstdCodec(JsonCodec())),
+    ('msgpack', MsgpackCodec),
+    ('zlib+msgpack', lambda: ZlibCodec(MsgpackCodec())),
+    ('zstd+msgpack', lambda: ZstdCodec(MsgpackCodec())),
+]
+
+
+def build_payloads():
+    page = Api(None)._parse_search_result(load_fixture('search.html'))
+    # Distinct users, so that compression cannot just fold repeated pages
+    users = [dict(page[i % len(page)], username=f"user_{i:06d}",
+                  profile_image=f"//ipstatic.net/thumbs/180x180/{i * 7919:08d}.jpg")
+             for i in range(SEARCH_RESULT_USERS)]
+    return {
+        'profile': ProfileParser().parse(load_fixture('profile.html')),
+        'search result': {'users': users},
+        'chat list': {'chats': ChatParser().parse_chat(load_fixture('chat_list.html'))},
+    }
+
+
+def rate(func, arg, min_time):
+    func(arg)  # warm up
+    iterations = 0
+    start = time.perf_counter()
+    while True:
+        func(arg)
+        iterations += 1
+        elapsed = time.perf_counter() - start
+        if elapsed >= min_time:
+            return iterations / elapsed
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__.split('\n\n')[0])
+    parser.add_argument('--min-time', type=float, default=0.5,
+                        help="seconds to run each measurement (default: 0.5)")
+    args = parser.parse_args(argv)
+
+    codecs = []
+    for name, factory in CODECS:
+        try:
+            codecs.append((name, factory()))
+        except ImportError as e:
+            print(f"skipping {name}: {e}", file=sys.stderr)
+
+    print(f"{'payload':<14} {'codec':<13} {'bytes':>8} {'ratio':>6} "
+          f"{'encode/s':>10} {'decode/s':>10}")
+    for payload_name, payload in build_payloads().items():
+        json_size = None
+        for name, codec in codecs:
+            registry = CodecRegistry(default=codec)
+            data = registry.encode('bench', payload)
+            if registry.decode(data) != payload:
+                print(f"{name} does not round-trip the {payload_name}",
+                      file=sys.stderr)
+                return 1
+            json_size = json_size or len(data)
+
+            encode = rate(lambda value: registry.encode('bench', value), payload,
+                          args.min_time)
+            decode = rate(registry.decode, data, args.min_time)
+            print(f"{payload_name:<14} {name:<13} {len(data):>8} "
+                  f"{len(data) / json_size:>6.2f} {encode:>10.1f} {decode:>10.1f}")
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
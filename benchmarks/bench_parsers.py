@@ -0,0 +1,159 @@
+"""
+Offline benchmark of the HTML parsers.
+
+Every parser is run against the saved pages in benchmarks/fixtures and
+reported with its throughput (pages/sec) and the peak memory allocated
+while parsing one page (tracemalloc). The fast parsers are checked against
+their BeautifulSoup fallbacks before anything is timed.
+
+    python -m benchmarks.bench_parsers
+    python -m benchmarks.bench_parsers --min-time 2 --only search
+    python -m benchmarks.bench_parsers --json > before.json
+"""
+import argparse
+import json
+import os
+import sys
+import time
+import tracemalloc
+
+from bs4 import BeautifulSoup
+
+from interpals_api.api import Api, ApiAsync
+from interpals_api.parsers.chat_parser import ChatParser, InboxHeader
+from interpals_api.parsers.friends_parser import FriendsParser
+from interpals_api.parsers.pictures_parser import PicturesParser
+from interpals_api.parsers.profile_parser import ProfileParser
+from interpals_api.parsers.search_parser import SearchParser
+
+
+FIXTURES = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'fixtures')
+
+api = Api(None)
+api_async = ApiAsync(None)
+chat_parser = ChatParser()
+pictures_parser = PicturesParser()
+
+
+def parse_inbox_soup(body):
+    soup = BeautifulSoup(body, 'lxml')
+    return InboxHeader(chat_parser._find_maxmsgid(soup),
+                       chat_parser._find_unread(soup))
+
+
+# (name, fixture, parse)
+CASES = [
+    ('ProfileParser.parse', 'profile.html', ProfileParser().parse),
+    ('Api._parse_profile', 'profile.html', api._parse_profile),
+    ('SearchParser.parse', 'search.html', SearchParser().parse),
+    ('Api._parse_search_result', 'search.html', api._parse_search_result),
+    ('Api._parse_search_result_soup', 'search.html',
+     api._parse_search_result_soup),
+    ('ChatParser.parse_inbox', 'inbox.html', chat_parser.parse_inbox),
+    ('ChatParser.parse_inbox (soup)', 'inbox.html', parse_inbox_soup),
+    ('ChatParser.parse_chat', 'chat_list.html', chat_parser.parse_chat),
+    ('ChatParser.parse_messages', 'messages.html', chat_parser.parse_messages),
+    ('FriendsParser.parse', 'friends.html', FriendsParser().parse),
+    ('PicturesParser.parse_albums', 'albums.html',
+     pictures_parser.parse_albums),
+    ('PicturesParser.parse_pictures', 'pictures.html',
+     pictures_parser.parse_pictures),
+    ('ApiAsync._parse_visitors', 'visitors.html', api_async._parse_visitors),
+]
+
+# Fast paths which must return exactly what their fallback returns
+PARITY = [
+    ('SearchParser.parse', 'Api._parse_search_result_soup'),
+    ('ChatParser.parse_inbox', 'ChatParser.parse_inbox (soup)'),
+]
+
+
+def load_fixture(name):
+    with open(os.path.join(FIXTURES, name), encoding='utf-8') as f:
+        return f.read()
+
+
+def check(cases, pages):
+    """
+    Returns a list of problems: parsers returning nothing for their
+    fixture and fast paths disagreeing with their fallbacks.
+    """
+    results = {name: parse(pages[fixture]) for name, fixture, parse in cases}
+
+    problems = [f"{name} returned nothing"
+                for name, result in results.items() if not result]
+    for fast, slow in PARITY:
+        if fast in results and slow in results \
+                and results[fast] != results[slow]:
+            problems.append(f"{fast} differs from {slow}")
+    return problems
+
+
+def measure(parse, body, min_time):
+    parse(body)  # warm up
+
+    iterations = 0
+    start = time.perf_counter()
+    while True:
+        parse(body)
+        iterations += 1
+        elapsed = time.perf_counter() - start
+        if elapsed >= min_time:
+            break
+
+    tracemalloc.start()
+    try:
+        parse(body)
+        _, peak = tracemalloc.get_traced_memory()
+    finally:
+        tracemalloc.stop()
+
+    return {
+        'pages_per_sec': iterations / elapsed,
+        'ms_per_page': elapsed / iterations * 1000,
+        'peak_kib': peak / 1024,
+        'page_kib': len(body.encode('utf-8')) / 1024,
+    }
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__.split('\n\n')[0])
+    parser.add_argument('--min-time', type=float, default=1.0,
+                        help="seconds to run each parser (default: 1.0)")
+    parser.add_argument('--only', action='append', default=[],
+                        help="run parsers whose name contains this "
+                             "substring; may be repeated")
+    parser.add_argument('--json', action='store_true',
+                        help="print the results as JSON")
+    args = parser.parse_args(argv)
+
+    cases = [case for case in CASES
+             if not args.only or any(part in case[0] for part in args.only)]
+    pages = {fixture: load_fixture(fixture) for _, fixture, _ in cases}
+
+    problems = check(cases, pages)
+    if problems:
+        for problem in problems:
+            print(problem, file=sys.stderr)
+        return 1
+
+    results = {}
+    for name, fixture, parse in cases:
+        results[name] = dict(measure(parse, pages[fixture], args.min_time),
+                             fixture=fixture)
+
+    if args.json:
+        print(json.dumps(results, indent=2))
+        return 0
+
+    print(f"{'parser':<32} {'fixture':<15} {'KiB':>6} {'pages/s':>10} "
+          f"{'ms/page':>9} {'peak KiB':>10}")
+    for name, result in results.items():
+        print(f"{name:<32} {result['fixture']:<15} {result['page_kib']:>6.1f} "
+              f"{result['pages_per_sec']:>10.1f} {result['ms_per_page']:>9.3f} "
+              f"{result['peak_kib']:>10.1f}")
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,82 @@
+"""
+Parity check of the search result parsers.
+
+SearchParser (lxml) must return exactly what the BeautifulSoup parser
+Api._parse_search_result_soup returns for every page of the corpus in
+benchmarks/fixtures/search_parity and for the benchmark's search.html.
+Pages SearchParser rejects with ValueError must still come out of
+Api._parse_search_result the same as out of the BeautifulSoup parser.
+
+    python -m benchmarks.check_search_parity
+"""
+import contextlib
+import io
+import os
+import sys
+
+from interpals_api.api import Api
+from interpals_api.parsers.search_parser import SearchParser
+
+from .bench_parsers import FIXTURES, load_fixture
+
+CORPUS = os.path.join(FIXTURES, 'search_parity')
+
+
+def corpus_pages():
+    names = sorted(name for name in os.listdir(CORPUS) if name.endswith('.html'))
+    return ['search.html'] + [os.path.join('search_parity', name) for name in names]
+
+
+def check_page(api, parser, body):
+    """
+    Returns a list of problems of one page.
+    """
+    # The BeautifulSoup parser prints the user blocks it skips
+    with contextlib.redirect_stdout(io.StringIO()):
+        expected = api._parse_search_result_soup(body)
+        parsed = api._parse_search_result(body)
+
+    problems = []
+    try:
+        fast = parser.parse(body)
+    except ValueError as e:
+        fast = None
+        print(f"  SearchParser rejected the page ({e}), checking the fallback")
+    if fast is not None and fast != expected:
+        problems.append(describe('SearchParser.parse', fast, expected))
+    if parsed != expected:
+        problems.append(describe('Api._parse_search_result', parsed, expected))
+    return problems
+
+
+def describe(name, result, expected):
+    if len(result) != len(expected):
+        return f"{name} returned {len(result)} users instead of {len(expected)}"
+    for index, (user, expected_user) in enumerate(zip(result, expected)):
+        for key in sorted(set(user) | set(expected_user)):
+            if user.get(key) != expected_user.get(key):
+                return (f"{name}: user {index} {key} is {user.get(key)!r} "
+                        f"instead of {expected_user.get(key)!r}")
+    return f"{name} differs"
+
+
+def main():
+    api = Api(None)
+    parser = SearchParser()
+    failed = 0
+    for page in corpus_pages():
+        print(page)
+        problems = check_page(api, parser, load_fixture(page))
+        for problem in problems:
+            print(f"  {problem}", file=sys.stderr)
+        failed += bool(problems)
+
+    if failed:
+        print(f"{failed} page(s) differ", file=sys.stderr)
+        return 1
+    print("all pages match")
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
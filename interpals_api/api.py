@@ -1,5 +1,7 @@
 import json
+import time
 import asyncio
+from collections import deque
 from urllib.parse import urlencode, urlparse, parse_qs
 from time import sleep
 
@@ -10,21 +12,56 @@ import re
 
 from .lib.errors import *
 from .lib.cookie import Cookie
-from .utils import find_csrf_token
+from .lib.http import create_client_session, create_requests_session
+from .lib.ratelimit import default_rate_limiter, endpoint_for
+from .lib.retry import RetryPolicy
+from .lib.metrics import default_metrics
+from .lib.tracing import default_tracer, traced
+from .store.memory import MemoryStore
+from .utils import find_csrf_token, maybe_await
 from .parsers.profile_parser import ProfileParser
 from .parsers.chat_parser import ChatParser
 from .parsers.friends_parser import FriendsParser
 from .parsers.pictures_parser import PicturesParser
+from .parsers.search_parser import SearchParser
 
 
 class Api:
+    # Seconds. Caps a whole request in ApiAsync, and connecting and each
+    # read in Api, as requests has no total timeout
     timeout = 3.0
+    # Tighter limits for connecting and for each read; timeout if None
+    connect_timeout = None
+    read_timeout = None
     host = "interpals.net"
     user_agent = "Mozilla/5.0 (X11; Linux x86_64) AppleWebKit/537.36 " \
                  "(KHTML, like Gecko) Chrome/70.0.3538.77 Safari/537.36"
 
-    def __init__(self, session):
+    def __init__(self, session, http=None, pool_size=10, max_retries=0,
+                 cache=None, profile_ttl=None, retry_policy=None):
         self._session = session
+        self._retry_policy = retry_policy or RetryPolicy()
+        # Key-value store (MemoryStore, RedisClient...) for cached lookups
+        self._cache = cache if cache is not None else MemoryStore(max_size=1024)
+        # Seconds parsed profiles are cached for, None disables caching
+        self.profile_ttl = profile_ttl
+        self._http = http
+        self._owns_http = http is None
+        self._pool_options = {
+            'pool_size': pool_size,
+            'max_retries': max_retries,
+        }
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        self.close()
+
+    def close(self):
+        if self._owns_http and self._http is not None:
+            self._http.close()
+        self._http = None
 
     def check_auth(self):
         if self._session:
@@ -36,7 +73,13 @@ class Api:
     def view(self, user):
         self._get(user, check_auth=True)
 
-    def profile(self, user):
+    def profile(self, user, max_age=None, force_refresh=False):
+        key = self._profile_cache_key(user)
+        if not force_refresh:
+            data = self._fresh_profile(self._cache.get(key), max_age)
+            if data is not None:
+                return data
+
         response = self._get(user, check_auth=True)
 
         if "User not found." in response.text:
@@ -44,6 +87,11 @@ class Api:
 
         parser = ProfileParser()
         data = parser.parse(response.text)
+        self.remember_uid(user, data['uid'])
+
+        if self.profile_ttl:
+            self._cache.set(key, self._profile_cache_entry(data),
+                            self.profile_ttl)
 
         return data
 
@@ -82,10 +130,29 @@ class Api:
             sleep(timeout)
 
     def get_uid(self, user):
+        uid = self.lookup_uid(user)
+        if uid is not None:
+            return uid
         profile_info = self.profile(user)
         return profile_info['uid']
 
+    def lookup_uid(self, user):
+        return self._cache.get(self._uid_key(user))
+
+    def lookup_username(self, uid):
+        return self._cache.get(self._username_key(uid))
+
+    def remember_uid(self, user, uid):
+        self._cache.set(self._uid_key(user), uid)
+        self._cache.set(self._username_key(uid), user)
+
     def get_thread_id(self, uid):
+        # A thread id never changes for a pair of users
+        key = self._thread_id_key(uid)
+        thread_id = self._cache.get(key)
+        if thread_id is not None:
+            return thread_id
+
         params = {'action': 'send', 'uid': uid}
         response = self._get("/pm.php", params)
         assert response.status_code == 301
@@ -93,14 +160,14 @@ class Api:
         location = response.headers['Location']
         thread_id = parse_qs(urlparse(location).query)['thread_id'][0]
 
+        self._cache.set(key, thread_id)
         return thread_id
 
     def chat(self, count=9, offset=0):
         chat_parser = ChatParser()
 
         response = self._get("/pm.php", check_auth=True)
-        maxmsgid = chat_parser.parse_maxmsgid(response.text)
-        unread = chat_parser.parse_unread(response.text)
+        maxmsgid, unread = chat_parser.parse_inbox(response.text)
 
         chats = []
         while len(chats) < count:
@@ -207,7 +274,7 @@ class Api:
         if params is not None:
             url = url + '?' + urlencode(params, True)
         full_url = self._get_full_url(url)
-        response = requests.get(full_url, headers=headers, timeout=self.timeout, allow_redirects=False)
+        response = self._send('get', full_url, headers=headers)
         if check_auth and not self._check_body_for_auth(response.text):
             raise APIAuthError()
         return response
@@ -216,11 +283,50 @@ class Api:
         headers = self._get_headers()
         headers['Content-Type'] = 'application/x-www-form-urlencoded'
         full_url = self._get_full_url(url)
-        response = requests.post(full_url, data=params, headers=headers, timeout=self.timeout, allow_redirects=False)
+        response = self._send('post', full_url, data=params, headers=headers)
         if check_auth and not self._check_body_for_auth(response.text):
             raise APIAuthError()
         return response
 
+    def _send(self, method, full_url, **kwargs):
+        http = self._get_http()
+        request_func = http.post if method == 'post' else http.get
+        attempt = 0
+        while True:
+            attempt += 1
+            try:
+                response = self._send_once(request_func, full_url, **kwargs)
+            except (APITimeoutError, APIConnectionError, APIServerError):
+                if not self._retry_policy.should_retry(method, attempt):
+                    raise
+                sleep(self._retry_policy.delay(attempt))
+            else:
+                return response
+
+    def _send_once(self, request_func, full_url, **kwargs):
+        try:
+            response = request_func(
+                full_url, timeout=self._phase_timeouts(),
+                allow_redirects=False, **kwargs
+            )
+        except requests.Timeout as exc:
+            raise APITimeoutError(str(exc)) from exc
+        except requests.ConnectionError as exc:
+            raise APIConnectionError(str(exc)) from exc
+        if response.status_code >= 500:
+            raise APIServerError(response.status_code, full_url)
+        return response
+
+    def _phase_timeouts(self):
+        return tuple(self.timeout if value is None else value
+                     for value in (self.connect_timeout, self.read_timeout))
+
+    def _get_http(self):
+        if self._http is None:
+            self._http = create_requests_session(**self._pool_options)
+            self._owns_http = True
+        return self._http
+
     def _get_headers(self):
         cookie = Cookie()
         cookie.update(self._session.cookie())
@@ -230,6 +336,33 @@ class Api:
         }
         return headers
 
+    def _uid_key(self, user):
+        return "uid:{}".format(user.lower())
+
+    def _username_key(self, uid):
+        return "username:{}".format(uid)
+
+    def _thread_id_key(self, uid):
+        return "thread_id:{}:{}".format(self._session.username.lower(), uid)
+
+    def _profile_cache_key(self, user):
+        # Per viewer: whether a profile is visible depends on who asks
+        return "profile:{}:{}".format(self._session.username.lower(),
+                                      user.lower())
+
+    def _profile_cache_entry(self, data):
+        return {'fetched_at': time.time(), 'data': data}
+
+    def _fresh_profile(self, entry, max_age=None):
+        # max_age overrides profile_ttl for one call; 0 always refetches
+        if entry is None:
+            return None
+        if max_age is None:
+            max_age = self.profile_ttl
+        if max_age is None or time.time() - entry['fetched_at'] > max_age:
+            return None
+        return entry['data']
+
     def _check_body_for_auth(self, body):
         return "/app/auth/logout" in body
 
@@ -410,6 +543,12 @@ class Api:
         return profile
 
     def _parse_search_result(self, body):
+        try:
+            return SearchParser().parse(body)
+        except Exception:
+            return self._parse_search_result_soup(body)
+
+    def _parse_search_result_soup(self, body):
         users = []
         soup = BeautifulSoup(body, "lxml")
         results = soup.find_all('div', class_='sResInner')
@@ -473,12 +612,52 @@ class Api:
         return users
 
     def _get_citycode(self, cityname):
-        response = self._get("/app/async/geoAc", {"query": cityname})
-        data = response.json()
-        return data['items'][0]['id']
+        key = self._city_key(cityname)
+        citycode = self._cache.get(key)
+        if citycode is None:
+            query = self._normalize_cityname(cityname)
+            response = self._get("/app/async/geoAc", {"query": query})
+            data = response.json()
+            citycode = data['items'][0]['id']
+            self._cache.set(key, citycode)
+        return citycode
+
+    def _normalize_cityname(self, cityname):
+        return ' '.join(cityname.split())
+
+    def _city_key(self, cityname):
+        return "city:{}".format(self._normalize_cityname(cityname).lower())
 
 
 class ApiAsync(Api):
+    def __init__(self, session, http=None, limit=100, limit_per_host=0,
+                 ttl_dns_cache=300, keepalive_timeout=30.0, cache=None,
+                 profile_ttl=None, rate_limiter=None, retry_policy=None,
+                 metrics=None, tracer=None):
+        super().__init__(session, http, cache=cache, profile_ttl=profile_ttl,
+                         retry_policy=retry_policy)
+        self._rate_limiter = rate_limiter or default_rate_limiter
+        self._metrics = metrics or default_metrics
+        self._tracer = tracer or default_tracer
+        self._pool_options = {
+            'limit': limit,
+            'limit_per_host': limit_per_host,
+            'ttl_dns_cache': ttl_dns_cache,
+            'keepalive_timeout': keepalive_timeout,
+        }
+
+    async def __aenter__(self):
+        return self
+
+    async def __aexit__(self, exc_type, exc, tb):
+        await self.aclose()
+
+    async def aclose(self):
+        if self._owns_http and self._http is not None:
+            await self._http.close()
+        self._http = None
+
+    @traced
     async def check_auth(self):
         if self._session:
             try:
@@ -490,12 +669,21 @@ class ApiAsync(Api):
         else:
             return False
 
+    @traced
     async def view(self, user):
         body = await self._request(user)
-        return self._parse_profile(body)
+        return self._parse('view', self._parse_profile, body)
         
 
-    async def profile(self, user):
+    @traced
+    async def profile(self, user, max_age=None, force_refresh=False):
+        key = self._profile_cache_key(user)
+        if not force_refresh:
+            entry = await maybe_await(self._cache.get(key))
+            data = self._fresh_profile(entry, max_age)
+            if data is not None:
+                return data
+
         html = await self._request(user)
 
         if "User not found." in html:
@@ -506,49 +694,108 @@ class ApiAsync(Api):
             raise APIError("Blocked by user")
 
         parser = ProfileParser()
-        data = parser.parse(html)
+        data = self._parse('profile', parser.parse, html)
+        await self.remember_uid(user, data['uid'])
+
+        if self.profile_ttl:
+            await maybe_await(self._cache.set(
+                key, self._profile_cache_entry(data), self.profile_ttl
+            ))
 
         return data
 
+    @traced
     async def visitors(self):
         html = await self._request("/app/views")
-        soup = BeautifulSoup(html, "lxml")
-        items = soup.find_all('div', class_='vBottomTxt')
-        users = []
-        for item in items:
-            user = item.find('a')['href'].split('?')[0][1:]
-            users.append(user)
-        return users
-
-    async def search(self, options, limit=1000, timeout=0.0):
+        return self._parse('visitors', self._parse_visitors, html)
+
+    @traced
+    async def search(self, options, limit=1000, timeout=0.0, concurrency=1,
+                     seen=None, stop_after_seen_pages=None):
+        """
+        Yields up to limit users matching options.
+
+        With seen (a SeenSet or SeenBloomFilter from seen_users) users
+        returned by earlier runs of the query are skipped and the users
+        yielded are added to it. stop_after_seen_pages then ends the search
+        after that many consecutive pages without a new user, which saves
+        the remaining requests when results are sorted newest first.
+        """
         html = await self._request("/app/search")
         csrf_token = find_csrf_token(html)
 
-        offset = 0
-        params = self._prepare_search_params(options)
+        params = await self._prepare_search_params(options)
         params['csrf_token'] = csrf_token
-        while True:
-            params['offset'] = str(offset)
-
-            html = await self._request("/app/search", params=params)
-            users = self._parse_search_result(html)
-
-            if not users:
-                return
-
-            for user in users:
-                yield user
-                offset += 1
-                if offset >= limit:
-                    return
-
-            await asyncio.sleep(timeout)
 
+        async def fetch_page(offset):
+            page_params = dict(params, offset=str(offset))
+            html = await self._request("/app/search", params=page_params)
+            return self._parse('search', self._parse_search_result, html)
+
+        count = 0
+        yielded = set()
+        seen_pages = 0
+        # Yielded since the last update of seen
+        unrecorded = []
+        pages = self._iter_pages(fetch_page, concurrency, timeout)
+        try:
+            async for users in pages:
+                if seen is not None:
+                    new = set(await seen.filter_new(
+                        [user['username'] for user in users if user['username']]
+                    ))
+                    seen_pages = 0 if new else seen_pages + 1
+                    if stop_after_seen_pages and seen_pages >= stop_after_seen_pages:
+                        return
+
+                for user in users:
+                    username = user['username']
+                    if username and username in yielded:
+                        continue
+                    if seen is not None and username and username not in new:
+                        continue
+                    yielded.add(username)
+
+                    if username:
+                        unrecorded.append(username)
+                    yield user
+                    count += 1
+                    if count >= limit:
+                        return
+
+                if seen is not None and unrecorded:
+                    await seen.add(unrecorded)
+                    unrecorded = []
+        finally:
+            await pages.aclose()
+            if seen is not None and unrecorded:
+                await seen.add(unrecorded)
+
+    @traced
     async def get_uid(self, user):
+        uid = await self.lookup_uid(user)
+        if uid is not None:
+            return uid
         profile_info = await self.profile(user)
         return profile_info['uid']
 
+    async def lookup_uid(self, user):
+        return await maybe_await(self._cache.get(self._uid_key(user)))
+
+    async def lookup_username(self, uid):
+        return await maybe_await(self._cache.get(self._username_key(uid)))
+
+    async def remember_uid(self, user, uid):
+        await maybe_await(self._cache.set(self._uid_key(user), uid))
+        await maybe_await(self._cache.set(self._username_key(uid), user))
+
+    @traced
     async def get_thread_id(self, uid):
+        key = self._thread_id_key(uid)
+        thread_id = await maybe_await(self._cache.get(key))
+        if thread_id is not None:
+            return thread_id
+
         params = {'action': 'send', 'uid': uid}
 
         try:
@@ -556,46 +803,69 @@ class ApiAsync(Api):
         except APIRedirectError as exc:
             location = exc.args[1]
             thread_id = parse_qs(urlparse(location).query)['thread_id'][0]
+            await maybe_await(self._cache.set(key, thread_id))
             return thread_id
         else:
             raise APIError("Could not load thread_id")
 
-    async def chat(self, count=9, offset=0):
-        chat_parser = ChatParser()
-
+    @traced
+    async def get_thread_ids(self, uids, concurrency=10):
+        """
+        Resolves thread ids of many users with at most concurrency
+        requests in flight. Returns a dict mapping uids to thread ids.
+        """
+        if concurrency < 1:
+            raise ValueError("concurrency must be at least 1")
+        semaphore = asyncio.Semaphore(concurrency)
+
+        async def resolve(uid):
+            async with semaphore:
+                return await self.get_thread_id(uid)
+
+        uids = list(dict.fromkeys(uids))
+        thread_ids = await asyncio.gather(*(resolve(uid) for uid in uids))
+        return dict(zip(uids, thread_ids))
+
+    @traced
+    async def chat(self, count=9, offset=0, concurrency=1):
         html = await self._request("/pm.php")
-        maxmsgid = chat_parser.parse_maxmsgid(html)
-        unread = chat_parser.parse_unread(html)
+        maxmsgid, unread = self._parse('inbox', ChatParser().parse_inbox,
+                                       html)
 
         chats = []
-        while len(chats) < count:
-            params = {
-                'action': 'more_threads',
-                'from': str(offset),
-                'filter': 'all',
-                'max_msg_id': maxmsgid,
-            }
-
-            text = await self._request("/pm.php", params=params, method='post', 
-                                       check_auth=False)
-            body = json.loads(text)['body']
-
-            items = chat_parser.parse_chat(body)
-            if not items:
-                break
-
-            for item in items:
-                chats.append(item)
-                if len(chats) >= count:
-                    break
-
-            offset += len(items)
+        if count > 0:
+            pages = self._chat_pages(maxmsgid, offset, concurrency)
+            try:
+                async for items in pages:
+                    chats.extend(items[:count - len(chats)])
+                    if len(chats) >= count:
+                        break
+            finally:
+                await pages.aclose()
 
         return {
             'chats': chats,
             'unread': unread
         }
 
+    @traced
+    async def iter_chats(self, offset=0, concurrency=1):
+        """
+        Yields chat threads page by page, as soon as each page is loaded.
+        With concurrency > 1 the following pages are loaded in parallel.
+        """
+        html = await self._request("/pm.php")
+        maxmsgid, _ = self._parse('inbox', ChatParser().parse_inbox, html)
+
+        pages = self._chat_pages(maxmsgid, offset, concurrency)
+        try:
+            async for items in pages:
+                for item in items:
+                    yield item
+        finally:
+            await pages.aclose()
+
+    @traced
     async def chat_messages(self, thread_id, last_msg_id=None):
         params = {
             'action': 'load_messages',
@@ -609,10 +879,50 @@ class ApiAsync(Api):
         body = json.loads(text)['body']
 
         chat_parser = ChatParser()
-        messages = chat_parser.parse_messages(body)
+        messages = self._parse('chat_messages', chat_parser.parse_messages,
+                               body)
 
         return messages
 
+    @traced
+    async def chat_messages_many(self, thread_ids, concurrency=10,
+                                 last_msg_ids=None, return_exceptions=False):
+        """
+        Loads messages of many threads with at most concurrency requests
+        in flight and yields (thread_id, messages) pairs as they complete.
+
+        last_msg_ids optionally maps thread ids to their last_msg_id. With
+        return_exceptions the exception takes the place of the messages
+        of a failed thread instead of stopping the iteration.
+        """
+        if concurrency < 1:
+            raise ValueError("concurrency must be at least 1")
+        last_msg_ids = last_msg_ids or {}
+        semaphore = asyncio.Semaphore(concurrency)
+
+        async def load(thread_id):
+            async with semaphore:
+                try:
+                    messages = await self.chat_messages(
+                        thread_id, last_msg_ids.get(thread_id)
+                    )
+                except Exception as exc:
+                    if not return_exceptions:
+                        raise
+                    messages = exc
+                return thread_id, messages
+
+        tasks = [asyncio.ensure_future(load(thread_id))
+                 for thread_id in thread_ids]
+        try:
+            for future in asyncio.as_completed(tasks):
+                yield await future
+        finally:
+            for task in tasks:
+                task.cancel()
+            await asyncio.gather(*tasks, return_exceptions=True)
+
+    @traced
     async def chat_send(self, thread_id, message):
         params = {
             'action': 'send_message',
@@ -624,6 +934,7 @@ class ApiAsync(Api):
         if '"error"' in text:
             raise APIError(text)
 
+    @traced
     async def chat_delete(self, thread_id):
         params = {
             'action': 'delete_thread',
@@ -633,13 +944,15 @@ class ApiAsync(Api):
         await self._request("/pm.php", params=params, method='post', 
                             check_auth=False)
 
+    @traced
     async def friends(self, uid):
         url = "/app/friends?uid={}".format(uid)
         html = await self._request(url)
         friends_parser = FriendsParser()
-        items = friends_parser.parse(html)
+        items = self._parse('friends', friends_parser.parse, html)
         return items
 
+    @traced
     async def friend_add(self, uid):
         url = "/app/friends/add?uid={}".format(uid)
         try:
@@ -649,6 +962,7 @@ class ApiAsync(Api):
         else:
             raise APIError("Could not add friend")
 
+    @traced
     async def friend_remove(self, uid):
         url = "/app/friends/delete?uid={}".format(uid)
         try:
@@ -658,19 +972,118 @@ class ApiAsync(Api):
         else:
             raise APIError("Could not delete friend")
 
+    @traced
     async def albums(self, uid):
         html = await self._request("/app/albums", params={'uid': uid})
         pictures_parser = PicturesParser()
-        items = pictures_parser.parse_albums(html)
+        items = self._parse('albums', pictures_parser.parse_albums, html)
         return items
 
+    @traced
     async def pictures(self, uid, aid):
         html = await self._request("/app/album", 
                                    params={'uid': uid, 'aid': aid})
         pictures_parser = PicturesParser()
-        items = pictures_parser.parse_pictures(html)
+        items = self._parse('pictures', pictures_parser.parse_pictures, html)
         return items
 
+    async def _prepare_search_params(self, options):
+        # Resolve the city code without blocking the loop, the sync
+        # implementation then uses it as given
+        if options.get('cityName') and not options.get('city'):
+            citycode = await self._get_citycode(options['cityName'])
+            options = dict(options, city=citycode)
+        return super()._prepare_search_params(options)
+
+    async def _get_citycode(self, cityname):
+        key = self._city_key(cityname)
+        citycode = await maybe_await(self._cache.get(key))
+        if citycode is None:
+            query = self._normalize_cityname(cityname)
+            text = await self._request("/app/async/geoAc",
+                                       params={"query": query},
+                                       check_auth=False)
+            citycode = json.loads(text)['items'][0]['id']
+            await maybe_await(self._cache.set(key, citycode))
+        return citycode
+
+    def _chat_pages(self, maxmsgid, offset=0, concurrency=1):
+        chat_parser = ChatParser()
+
+        async def fetch_page(page_offset):
+            params = {
+                'action': 'more_threads',
+                'from': str(offset + page_offset),
+                'filter': 'all',
+                'max_msg_id': maxmsgid,
+            }
+            text = await self._request("/pm.php", params=params, method='post',
+                                       check_auth=False)
+            body = json.loads(text)['body']
+            return self._parse('chat', chat_parser.parse_chat, body)
+
+        return self._iter_pages(fetch_page, concurrency)
+
+    async def _iter_pages(self, fetch_page, concurrency=1, interval=0.0):
+        """
+        Yields non-empty pages returned by fetch_page(offset) in offset order.
+
+        The first page tells the page size. With concurrency > 1 the
+        following offsets are requested ahead in a window of that many
+        pages, and request starts are spaced by at least interval seconds.
+        Iteration stops at the first empty or short page.
+        """
+        page = await fetch_page(0)
+        if not page:
+            return
+        yield page
+
+        step = len(page)
+        offset = step
+
+        if concurrency <= 1:
+            while True:
+                await asyncio.sleep(interval)
+                page = await fetch_page(offset)
+                if not page:
+                    return
+                yield page
+                offset += len(page)
+
+        loop = asyncio.get_running_loop()
+        last_start = loop.time()
+        pending = deque()
+
+        async def fetch_at(offset, start):
+            delay = start - loop.time()
+            if delay > 0:
+                await asyncio.sleep(delay)
+            return await fetch_page(offset)
+
+        def launch():
+            nonlocal offset, last_start
+            last_start = max(loop.time(), last_start + interval)
+            task = asyncio.ensure_future(fetch_at(offset, last_start))
+            pending.append(task)
+            offset += step
+
+        try:
+            for _ in range(concurrency):
+                launch()
+
+            while pending:
+                page = await pending.popleft()
+                if not page:
+                    return
+                yield page
+                if len(page) < step:
+                    return
+                launch()
+        finally:
+            for task in pending:
+                task.cancel()
+            await asyncio.gather(*pending, return_exceptions=True)
+
     async def _request(self, url, method='get', params=None, check_auth=True):
         assert method in ('get', 'post')
 
@@ -680,26 +1093,91 @@ class ApiAsync(Api):
         if method == 'post':
             headers['Content-Type'] = 'application/x-www-form-urlencoded'
 
+        connect_timeout, read_timeout = self._phase_timeouts()
         kwargs = {
             'url': full_url,
             'headers': headers,
-            'timeout': self.timeout,
+            'timeout': aiohttp.ClientTimeout(total=self.timeout,
+                                             sock_connect=connect_timeout,
+                                             sock_read=read_timeout),
             'allow_redirects': False,
         }
 
         if method == 'post':
             kwargs['data'] = params
 
-        async with aiohttp.ClientSession() as session:
-            request_func = session.post if method == 'post' else session.get
-            async with request_func(**kwargs) as resp:
-                if resp.status in (301, 302):
-                    raise APIRedirectError(
-                        resp.status, resp.headers['Location']
-                    )
-                body = await resp.text()
+        attempt = 0
+        while True:
+            attempt += 1
+            try:
+                body = await self._send_once(method, url, kwargs)
+            except (APITimeoutError, APIConnectionError, APIServerError):
+                if not self._retry_policy.should_retry(method, attempt):
+                    raise
+                self._metrics.observe_retry(endpoint_for(url))
+                await asyncio.sleep(self._retry_policy.delay(attempt))
+            else:
+                break
 
         if check_auth and not self._check_body_for_auth(body):
             raise APIAuthError()
         
         return body
+
+    async def _send_once(self, method, url, kwargs):
+        session_key = self._session.username if self._session else None
+        endpoint = endpoint_for(url)
+        async with self._rate_limiter.limit(session_key, endpoint):
+            http = self._get_http()
+            request_func = http.post if method == 'post' else http.get
+            status = 'error'
+            size = 0
+            start = time.perf_counter()
+            with self._tracer.span("HTTP {}".format(method.upper()),
+                                   endpoint=endpoint) as span:
+                try:
+                    async with request_func(**kwargs) as resp:
+                        status = resp.status
+                        if resp.status in (301, 302):
+                            raise APIRedirectError(
+                                resp.status, resp.headers['Location']
+                            )
+                        if resp.status >= 500:
+                            raise APIServerError(resp.status, kwargs['url'])
+                        size = len(await resp.read())
+                        return await resp.text()
+                except asyncio.TimeoutError as exc:
+                    status = 'timeout'
+                    raise APITimeoutError(str(exc)) from exc
+                except aiohttp.ClientConnectionError as exc:
+                    status = 'connection_error'
+                    raise APIConnectionError(str(exc)) from exc
+                finally:
+                    span.set_attribute('http.status', str(status))
+                    span.set_attribute('http.response_bytes', size)
+                    self._metrics.observe_request(
+                        endpoint, method, status, time.perf_counter() - start,
+                        size
+                    )
+
+    def _parse(self, name, parse, *args):
+        with self._tracer.span("parse {}".format(name)), \
+                self._metrics.time_parse(name):
+            return parse(*args)
+
+    def _parse_visitors(self, html):
+        soup = BeautifulSoup(html, "lxml")
+        items = soup.find_all('div', class_='vBottomTxt')
+        users = []
+        for item in items:
+            user = item.find('a')['href'].split('?')[0][1:]
+            users.append(user)
+        return users
+
+    def _get_http(self):
+        # The session is created lazily because aiohttp binds it to the
+        # running event loop.
+        if self._http is None or self._http.closed:
+            self._http = create_client_session(**self._pool_options)
+            self._owns_http = True
+        return self._http
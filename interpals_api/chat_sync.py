@@ -0,0 +1,104 @@
+from .store.memory import MemoryStore
+from .utils import maybe_await
+
+
+class ChatSync:
+    """
+    Incremental synchronization of the inbox of an ApiAsync session.
+
+    For every thread the store keeps the highest msg_id seen so far (the
+    last_msg_id watermark) and the state of the thread in the inbox list
+    (new/unread flags and snippet). A poll only loads messages of threads
+    whose state changed and returns the messages above the watermark.
+    load_messages only returns the latest page of a thread, so older pages
+    are loaded through last_msg_id until one reaches the watermark. The
+    first poll of a thread only returns its latest page.
+
+    The states of all listed threads are read with one mget and the new
+    states written with one set_many, so any store with these methods works:
+    MemoryStore, RedisClient or AsyncRedisClient.
+    """
+
+    key_prefix = "chat_sync"
+
+    def __init__(self, api, store=None, concurrency=10):
+        self._api = api
+        self._store = store if store is not None else MemoryStore()
+        self._concurrency = concurrency
+
+    async def poll(self, count=50):
+        """
+        Checks the latest count threads and returns a dict mapping the
+        thread ids which changed to their new messages.
+        """
+        result = await self._api.chat(count=count)
+        chats = result['chats']
+        states = await maybe_await(self._store.mget(
+            [self._key(chat['thread_id']) for chat in chats]
+        ))
+
+        changed = {}
+        for chat, state in zip(chats, states):
+            if state is None or state['signature'] != self._signature(chat):
+                changed[chat['thread_id']] = (chat, state)
+
+        updates = {}
+        new_states = {}
+        messages_many = self._api.chat_messages_many(
+            list(changed), concurrency=self._concurrency
+        )
+        async for thread_id, messages in messages_many:
+            chat, state = changed[thread_id]
+            last_msg_id = state['last_msg_id'] if state else None
+            if last_msg_id is not None:
+                messages = await self._load_since(thread_id, messages,
+                                                  last_msg_id)
+
+            new_messages = [
+                message for message in messages
+                if last_msg_id is None
+                or int(message['msg_id']) > int(last_msg_id)
+            ]
+            if new_messages:
+                last_msg_id = max((message['msg_id'] for message in new_messages),
+                                  key=int)
+
+            new_states[self._key(thread_id)] = {
+                'last_msg_id': last_msg_id,
+                'signature': self._signature(chat),
+            }
+            updates[thread_id] = new_messages
+
+        if new_states:
+            await maybe_await(self._store.set_many(new_states))
+        return updates
+
+    async def _load_since(self, thread_id, messages, last_msg_id):
+        # Page back until a page reaches the watermark or comes back empty
+        messages = list(messages)
+        while messages:
+            oldest = min((message['msg_id'] for message in messages), key=int)
+            if int(oldest) <= int(last_msg_id):
+                break
+            older = [
+                message for message in
+                await self._api.chat_messages(thread_id, last_msg_id=oldest)
+                if int(message['msg_id']) < int(oldest)
+            ]
+            if not older:
+                break
+            messages = older + messages
+        return messages
+
+    async def last_msg_id(self, thread_id):
+        state = await maybe_await(self._store.get(self._key(thread_id)))
+        return state['last_msg_id'] if state else None
+
+    async def reset(self, thread_id):
+        await maybe_await(self._store.delete(self._key(thread_id)))
+
+    def _key(self, thread_id):
+        return f"{self.key_prefix}:{self._api._session.username}:{thread_id}"
+
+    def _signature(self, chat):
+        return [chat['new'], chat['unread'], chat['i_sent'], chat['message']]
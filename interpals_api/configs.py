@@ -7,3 +7,4 @@ class Config:
     REDIS_HOST = os.getenv("REDIS_HOST")
     REDIS_PORT = os.getenv("REDIS_PORT")
     REDIS_PASSWORD = os.getenv("REDIS_PASSWORD")
+    OTEL_TRACING = os.getenv("OTEL_TRACING", "").lower() in ("1", "true", "yes")
@@ -1,8 +1,9 @@
+from datetime import datetime, timezone
 from fastapi import HTTPException
-from .parsers import parse_and_validate_search_options, parse_cron_from_date
+from .parsers import parse_and_validate_chat_options, parse_and_validate_search_options, parse_cron_from_date, next_cron_time
 from .validate import validate_days
-from ..store.store import redis_client
-from ..lib.errors import ExistingKeyException
+from ..store.store import async_redis_client
+from ..lib.errors import CronSyntaxParsingException, ExistingKeyException
 from .models import JobConfigRequest, JobType
 import json
 
@@ -10,25 +11,51 @@ import json
 
 
 REDIS_JOB_BASE_KEY = "job"
+# Hash of job name -> job, and sorted set of job names scored by their next run (unix time)
+REDIS_JOB_INDEX_KEY = "jobs"
+REDIS_JOB_SCHEDULE_KEY = "jobs_schedule"
+# Set once the job:{name} keys of earlier versions were moved into the registry
+REDIS_JOB_MIGRATED_KEY = "jobs_migrated"
+# Sessions of logged in users, as stored by /login
+REDIS_SESSION_BASE_KEY = "session"
+# Auth token of the latest session of every account, kept by /login for the worker
+REDIS_ACCOUNT_SESSION_BASE_KEY = "account_session"
 
-async def add_cron_job(job: JobConfigRequest):
-    job_name = f"{REDIS_JOB_BASE_KEY}:{job.job_name}"
+
+def account_session_key(username: str) -> str:
+    return f"{REDIS_ACCOUNT_SESSION_BASE_KEY}:{username.lower()}"
+
+
+async def add_cron_job(job: JobConfigRequest, username=None):
+    """
+    Stores a cron job. Only the account that created it is stored along, never the
+    interpals cookies: at every run the worker (job/worker.py) uses the latest live
+    session of that account, see get_job_session.
+    """
     try:
-        existing_job = redis_client.get(job_name)
-        if existing_job is not None:
-            raise ExistingKeyException("A job with this name already exists.")
         #todo: add other cron job validations - jobs must be spaced at least an hour apart, not more than a specified number daily
         days = validate_days(job.days)
         if job.type == JobType.SEARCH:
-            job.data = parse_and_validate_search_options(job.data)
+            job.data = parse_and_validate_search_options(job.data).model_dump(mode="json", warnings=False)
+        elif job.type == JobType.CHAT:
+            job.data = parse_and_validate_chat_options(job.data).model_dump(mode="json")
 
         job_dict = {
             "cron_time": parse_cron_from_date(job.min, job.hour, days),
             "job_type": job.type.value,
             "data": job.data,
         }
-        redis_client.set(job_name, json.dumps(job_dict))
-        return job_name
+        if username is not None:
+            job_dict["username"] = username
+        next_run = next_cron_time(job_dict["cron_time"], datetime.now(timezone.utc))
+
+        async with async_redis_client.client.pipeline(transaction=True) as pipe:
+            pipe.hsetnx(REDIS_JOB_INDEX_KEY, job.job_name, json.dumps(job_dict))
+            pipe.zadd(REDIS_JOB_SCHEDULE_KEY, {job.job_name: next_run.timestamp()}, nx=True)
+            created, _ = await pipe.execute()
+        if not created:
+            raise ExistingKeyException("A job with this name already exists.")
+        return f"{REDIS_JOB_BASE_KEY}:{job.job_name}"
 
     except ExistingKeyException as e:
         raise HTTPException(status_code=400, detail=str(e))
@@ -38,14 +65,127 @@ async def add_cron_job(job: JobConfigRequest):
 
 async def get_cron_jobs():
     try:
-        jobs = redis_client.get_values_with_prefix(REDIS_JOB_BASE_KEY)
-        return jobs
+        jobs = await async_redis_client.client.hgetall(REDIS_JOB_INDEX_KEY)
+        job_list = []
+        for name, value in sorted(jobs.items()):
+            job_dict = json.loads(value)
+            job_dict.pop("session_token", None)
+            job_list.append({"key": f"{REDIS_JOB_BASE_KEY}:{name.decode()}", "data": job_dict})
+        return job_list
     except Exception as e:
         raise HTTPException(status_code=500, detail=f"Failed to retrieve jobs: {str(e)}")
 
 
 async def count_cron_jobs():
     try:
-        return redis_client.count_keys_with_prefix(REDIS_JOB_BASE_KEY)
+        return await async_redis_client.client.hlen(REDIS_JOB_INDEX_KEY)
     except Exception as e:
-        raise HTTPException(status_code=500, detail=f"Failed to count jobs: {str(e)}")
\ No newline at end of file
+        raise HTTPException(status_code=500, detail=f"Failed to count jobs: {str(e)}")
+
+
+async def delete_cron_job(job_name: str) -> bool:
+    """
+    Removes a job from the registry. Returns False if there was no such job.
+    """
+    try:
+        async with async_redis_client.client.pipeline(transaction=True) as pipe:
+            pipe.hdel(REDIS_JOB_INDEX_KEY, job_name)
+            pipe.zrem(REDIS_JOB_SCHEDULE_KEY, job_name)
+            pipe.delete(f"{REDIS_JOB_BASE_KEY}:{job_name}")
+            deleted, _, legacy_deleted = await pipe.execute()
+        return bool(deleted or legacy_deleted)
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=f"Failed to delete job: {str(e)}")
+
+
+async def get_job_session(job: dict):
+    """
+    Returns the credentials of the latest live session of the job's account, or None
+    if the account has no session (all expired or logged out).
+    """
+    if job.get("username"):
+        session_token = await async_redis_client.get(account_session_key(job["username"]))
+    else:
+        # Jobs stored with the token of the session that created them
+        session_token = job.get("session_token")
+    if not session_token:
+        return None
+    return await async_redis_client.get(f"{REDIS_SESSION_BASE_KEY}:{session_token}")
+
+
+async def get_due_cron_jobs(now: datetime):
+    """
+    Returns (job_name, job, run_time) for every job scheduled at or before now.
+    job is None if the job was deleted after being scheduled.
+    """
+    scheduled = await async_redis_client.client.zrangebyscore(
+        REDIS_JOB_SCHEDULE_KEY, "-inf", now.timestamp(), withscores=True)
+    if not scheduled:
+        return []
+
+    values = await async_redis_client.client.hmget(REDIS_JOB_INDEX_KEY, [name for name, _ in scheduled])
+    return [
+        (name.decode(), json.loads(value) if value is not None else None,
+         datetime.fromtimestamp(score, timezone.utc))
+        for (name, score), value in zip(scheduled, values)
+    ]
+
+
+async def reschedule_cron_job(job_name: str, job: dict, after: datetime):
+    """
+    Moves a job to its first run time after the given time, or drops it from the
+    schedule if it no longer exists.
+    """
+    if job is None:
+        await async_redis_client.client.zrem(REDIS_JOB_SCHEDULE_KEY, job_name)
+        return
+    next_run = next_cron_time(job["cron_time"], after)
+    # xx: never re-add a job deleted in the meantime
+    await async_redis_client.client.zadd(REDIS_JOB_SCHEDULE_KEY, {job_name: next_run.timestamp()}, xx=True)
+
+
+async def get_next_run_time():
+    """
+    Returns the earliest scheduled run time, or None if there are no jobs.
+    """
+    first = await async_redis_client.client.zrange(REDIS_JOB_SCHEDULE_KEY, 0, 0, withscores=True)
+    return datetime.fromtimestamp(first[0][1], timezone.utc) if first else None
+
+
+async def index_legacy_jobs(force: bool = False) -> int:
+    """
+    Moves jobs stored as job:{name} keys by earlier versions into the registry.
+    Returns the number of jobs moved.
+
+    The keyspace is only scanned once: afterwards a marker key makes this return
+    right away, unless force is set. Malformed jobs are skipped and left in place.
+    """
+    if not force and await async_redis_client.client.exists(REDIS_JOB_MIGRATED_KEY):
+        return 0
+
+    moved = 0
+    now = datetime.now(timezone.utc)
+    async for key in async_redis_client.client.scan_iter(match=f"{REDIS_JOB_BASE_KEY}:*", count=100):
+        value = await async_redis_client.client.get(key)
+        if value is None:
+            continue
+        job_name = key.decode()[len(REDIS_JOB_BASE_KEY) + 1:]
+        try:
+            job_dict = json.loads(value)
+            # Earlier versions encoded the job twice
+            if isinstance(job_dict, str):
+                job_dict = json.loads(job_dict)
+            next_run = next_cron_time(job_dict["cron_time"], now)
+        except (ValueError, KeyError, TypeError, CronSyntaxParsingException) as e:
+            print(f"Skipping malformed legacy job '{job_name}': {e!r}")
+            continue
+
+        async with async_redis_client.client.pipeline(transaction=True) as pipe:
+            pipe.hsetnx(REDIS_JOB_INDEX_KEY, job_name, json.dumps(job_dict))
+            pipe.zadd(REDIS_JOB_SCHEDULE_KEY, {job_name: next_run.timestamp()}, nx=True)
+            pipe.delete(key)
+            await pipe.execute()
+        moved += 1
+
+    await async_redis_client.client.set(REDIS_JOB_MIGRATED_KEY, now.isoformat())
+    return moved
@@ -1,9 +1,12 @@
 from enum import Enum
 from typing import List, Optional
-from pydantic import BaseModel
+from pydantic import BaseModel, Field
 
 from ..lib.constants import ContinentCode, Genders, CountryCode, SortOptions
 
+# Result pages requested at once by a single search or chat listing
+MAX_SEARCH_CONCURRENCY = 8
+
 
 class JobType(Enum):
     SEARCH = "search"
@@ -31,4 +34,13 @@ class SearchOptions(BaseModel):
     cityName: Optional[str] = None
     sort: SortOptions = SortOptions.NEWEST_FIRST.value
     limit: Optional[int] = 1000
-    timeout: Optional[float] = 0.0
\ No newline at end of file
+    timeout: Optional[float] = 0.0
+    concurrency: Optional[int] = Field(1, ge=1, le=MAX_SEARCH_CONCURRENCY)
+    skip_seen: Optional[bool] = False
+    stop_after_seen_pages: Optional[int] = Field(None, ge=1)
+
+
+class ChatOptions(BaseModel):
+    count: int = Field(9, ge=1)
+    offset: int = Field(0, ge=0)
+    concurrency: int = Field(1, ge=1, le=MAX_SEARCH_CONCURRENCY)
\ No newline at end of file
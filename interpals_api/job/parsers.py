@@ -1,10 +1,11 @@
 
-from typing import List, Union
+from datetime import datetime, timedelta
+from typing import List, Tuple, Union
 from pydantic import ValidationError
 from .validate import is_valid_hour, is_valid_minute, convert_day_list_to_index, validate_search_ages, validate_countries, validate_continents, validate_sex_options
 from ..lib.constants import SortOptions
 from ..lib.errors import CronSyntaxParsingException
-from .models import SearchOptions
+from .models import ChatOptions, SearchOptions
 from ..utils import validate_enum_value
 
 
@@ -33,6 +34,48 @@ def parse_cron_from_date(minute: int, hour: int, days: List[str]) -> str:
     return cron_syntax
 
 
+def parse_cron_expression(cron: str) -> Tuple[int, int, List[int]]:
+    """
+    Parse a cron expression built by parse_cron_from_date.
+
+    :param cron: Cron string in the "m h * * d,d" format, days may also be "*"
+    :return: Minute, hour and the sorted list of weekday indexes (0 for sun)
+    :raises CronSyntaxParsingException: If the expression is not in that format
+    """
+    fields = cron.split()
+    if len(fields) != 5 or fields[2] != "*" or fields[3] != "*":
+        raise CronSyntaxParsingException(f"Unsupported cron expression: {cron!r}.")
+
+    try:
+        minute, hour = int(fields[0]), int(fields[1])
+        days = list(range(7)) if fields[4] == "*" else sorted({int(day) for day in fields[4].split(",")})
+    except ValueError:
+        raise CronSyntaxParsingException(f"Unsupported cron expression: {cron!r}.")
+
+    if not is_valid_minute(minute) or not is_valid_hour(hour) or not all(0 <= day <= 6 for day in days):
+        raise CronSyntaxParsingException(f"Cron expression out of range: {cron!r}.")
+    return minute, hour, days
+
+
+def next_cron_time(cron: str, after: datetime) -> datetime:
+    """
+    Return the first fire time of a cron expression strictly after the given time.
+
+    :param cron: Cron string in the "m h * * d,d" format
+    :param after: Reference time; the result has the same tzinfo
+    """
+    minute, hour, days = parse_cron_expression(cron)
+    for offset in range(8):
+        candidate = (after + timedelta(days=offset)).replace(hour=hour, minute=minute, second=0, microsecond=0)
+        if candidate > after and _cron_weekday(candidate) in days:
+            return candidate
+
+
+def _cron_weekday(moment: datetime) -> int:
+    # datetime counts from monday, cron from sunday
+    return (moment.weekday() + 1) % 7
+
+
 def parse_and_validate_search_options(options: Union[dict, None]) -> SearchOptions:    
     if not isinstance(options, dict):
         raise ValueError("Search options must be a dictionary.")
@@ -43,12 +86,15 @@ def parse_and_validate_search_options(options: Union[dict, None]) -> SearchOptio
         'age2': options.get('age2', '110'),
         'sex': options.get('sex', ['male', 'female']),
         'continents': options.get('continents', ['AF', 'AS', 'EU', 'NA', 'OC', 'SA']),
-        'countries': options.get('countries', ['---']),
+        'countries': options.get('countries', []),
         'keywords': options.get('keywords', ''),
         'city': options.get('city'),
         'cityName': options.get('cityName'),
         'limit': options.get('limit', 1000),
         'timeout': options.get('timeout', 0.0),
+        'concurrency': options.get('concurrency', 1),
+        'skip_seen': bool(options.get('skip_seen', False)),
+        'stop_after_seen_pages': options.get('stop_after_seen_pages'),
         'online': bool(options.get('online', False)),
         'photo': bool(options.get('photo', False)),
     }
@@ -71,3 +117,15 @@ def parse_and_validate_search_options(options: Union[dict, None]) -> SearchOptio
 
     except Exception as e:
         raise ValueError(f"Custom validation error: {str(e)}")
+
+
+def parse_and_validate_chat_options(options: Union[dict, None]) -> ChatOptions:
+    if options is None:
+        options = {}
+    if not isinstance(options, dict):
+        raise ValueError("Chat options must be a dictionary.")
+
+    try:
+        return ChatOptions(**options)
+    except ValidationError as e:
+        raise ValueError(f"ChatOptions validation failed: {str(e)}")
@@ -17,7 +17,7 @@ def validate_search_ages(age1: Optional[int], age2: Optional[int]):
     age1 = age1 if age1 is not None else 16
     age2 = age2 if age2 is not None else 120
 
-    if age2 < age1:
+    if int(age2) < int(age1):
         raise ValueError(f"age2 ({age2}) cannot be less than age1 ({age1})")
 
     return [age1, age2]
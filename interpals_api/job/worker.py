@@ -0,0 +1,171 @@
+import argparse
+import asyncio
+from datetime import datetime, timedelta, timezone
+
+from .job_configurations import (get_due_cron_jobs, get_job_session, get_next_run_time, index_legacy_jobs,
+                                 reschedule_cron_job)
+from .models import JobType
+from .parsers import parse_and_validate_chat_options
+from ..api import ApiAsync
+from ..configs import Config
+from ..lib.http import create_client_session
+from ..lib.ratelimit import RATE_LIMIT_ENDPOINTS, RATE_LIMIT_SESSION, RateLimiter
+from ..lib.session import Session
+from ..lib.tracing import OpenTelemetryTracer, default_tracer
+from ..seen_users import seen_for_search
+from ..store.store import async_redis_client
+
+REDIS_JOB_RESULT_KEY = "job_result"
+REDIS_JOB_LOCK_KEY = "job_lock"
+JOB_RESULT_EXPIRE_TIME = 7 * 24 * 3600
+# A fire time missed by more than this (worker down, busy pool) is skipped
+MISFIRE_GRACE_TIME = 300
+# Must outlive the grace time, so that a late replica cannot fire the same time again
+JOB_LOCK_EXPIRE_TIME = 3600
+WORKER_CONCURRENCY = 4
+POLL_INTERVAL = 30.0
+
+
+class JobWorker:
+    """
+    Executes the cron jobs stored by add_cron_job.
+
+    The worker sleeps until the earliest run time in the job schedule (or at most
+    poll_interval), then dispatches every due job to a pool of at most concurrency
+    running jobs and moves it to its next run time. Runs missed by more than
+    MISFIRE_GRACE_TIME are skipped. A job fires only after winning the lock
+    job_lock:{name}:{time} (SET NX), so any number of workers can run side by side
+    without firing a job twice. Results are stored under job_result:{name}.
+    Cron times are in UTC.
+    """
+
+    def __init__(self, http=None, concurrency=WORKER_CONCURRENCY, poll_interval=POLL_INTERVAL,
+                 rate_limiter=None, tracer=None):
+        self._http = http
+        self._tracer = tracer
+        self._poll_interval = poll_interval
+        self._rate_limiter = rate_limiter
+        self._semaphore = asyncio.Semaphore(concurrency)
+        self._tasks = set()
+
+    async def run(self):
+        """
+        Polls and dispatches jobs until cancelled, then waits for running jobs.
+        """
+        try:
+            while True:
+                now = datetime.now(timezone.utc)
+                await self.dispatch_due(now)
+                await asyncio.sleep(await self._sleep_time())
+        finally:
+            if self._tasks:
+                await asyncio.gather(*self._tasks, return_exceptions=True)
+
+    async def dispatch_due(self, now):
+        """
+        Starts every job due at now and returns the names of the jobs started.
+        """
+        started = []
+        for name, job, fire_time in await get_due_cron_jobs(now):
+            try:
+                await reschedule_cron_job(name, job, now)
+            except Exception as e:
+                print(f"Skipping job '{name}': {e}")
+                continue
+            if job is None:
+                continue
+            if now - fire_time > timedelta(seconds=MISFIRE_GRACE_TIME):
+                print(f"Job '{name}' missed its run at {fire_time.isoformat()}")
+                continue
+
+            lock_key = f"{REDIS_JOB_LOCK_KEY}:{name}:{int(fire_time.timestamp())}"
+            if not await async_redis_client.set_if_absent(lock_key, now.isoformat(), JOB_LOCK_EXPIRE_TIME):
+                continue
+
+            task = asyncio.create_task(self._run_job(name, job, fire_time))
+            self._tasks.add(task)
+            task.add_done_callback(self._tasks.discard)
+            started.append(name)
+        return started
+
+    async def execute(self, job):
+        """
+        Runs a single job and returns its result.
+        """
+        credentials = await get_job_session(job)
+        if not credentials:
+            raise ValueError("The session of the job expired or was logged out.")
+        session = Session(credentials["username"], credentials["session_id"], credentials["csrf_cookie"])
+        # City codes, uids and thread ids are cached in Redis across runs, as by the app
+        api = ApiAsync(session, http=self._http, cache=async_redis_client, rate_limiter=self._rate_limiter,
+                       tracer=self._tracer)
+
+        job_type = JobType(job["job_type"])
+        data = dict(job.get("data") or {})
+        if job_type == JobType.SEARCH:
+            limit = data.pop("limit", 1000)
+            timeout = data.pop("timeout", 0.0)
+            concurrency = data.pop("concurrency", 1)
+            skip_seen = data.pop("skip_seen", False)
+            stop_after_seen_pages = data.pop("stop_after_seen_pages", None)
+            options = {key: value for key, value in data.items() if value is not None}
+            # Recurring runs only report users which earlier runs did not
+            seen = seen_for_search(async_redis_client, session.username, options) if skip_seen else None
+            users = [user async for user in api.search(options, limit=limit, timeout=timeout,
+                                                       concurrency=concurrency, seen=seen,
+                                                       stop_after_seen_pages=stop_after_seen_pages)]
+            return {"users": users}
+        if job_type == JobType.CHAT:
+            options = parse_and_validate_chat_options(data)
+            return await api.chat(count=options.count, offset=options.offset, concurrency=options.concurrency)
+
+    async def _run_job(self, name, job, fire_time):
+        async with self._semaphore:
+            started_at = datetime.now(timezone.utc)
+            result = {"fire_time": fire_time.isoformat(), "started_at": started_at.isoformat()}
+            try:
+                result["result"] = await self.execute(job)
+                result["status"] = "success"
+            except Exception as e:
+                print(f"Job '{name}' failed: {e}")
+                result["status"] = "error"
+                result["error"] = str(e)
+            result["finished_at"] = datetime.now(timezone.utc).isoformat()
+            await async_redis_client.set(f"{REDIS_JOB_RESULT_KEY}:{name}", result, JOB_RESULT_EXPIRE_TIME)
+
+    async def _sleep_time(self):
+        # Wake up for the next run, but poll regularly to pick up earlier new jobs
+        next_run = await get_next_run_time()
+        if next_run is None:
+            return self._poll_interval
+        return min(self._poll_interval, max((next_run - datetime.now(timezone.utc)).total_seconds(), 0.0))
+
+
+async def main(concurrency=WORKER_CONCURRENCY, poll_interval=POLL_INTERVAL, reindex_legacy_jobs=False):
+    http = create_client_session()
+    rate_limiter = RateLimiter(RATE_LIMIT_SESSION, RATE_LIMIT_ENDPOINTS)
+    tracer = OpenTelemetryTracer() if Config.OTEL_TRACING else default_tracer
+    await async_redis_client.ping()
+    await index_legacy_jobs(force=reindex_legacy_jobs)
+    try:
+        worker = JobWorker(http=http, concurrency=concurrency, poll_interval=poll_interval,
+                           rate_limiter=rate_limiter, tracer=tracer)
+        await worker.run()
+    finally:
+        await http.close()
+        await async_redis_client.aclose()
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Runs the stored cron jobs.")
+    parser.add_argument("--concurrency", type=int, default=WORKER_CONCURRENCY,
+                        help="maximum number of jobs running at once")
+    parser.add_argument("--poll-interval", type=float, default=POLL_INTERVAL,
+                        help="seconds between reloads of the job list")
+    parser.add_argument("--reindex-legacy-jobs", action="store_true",
+                        help="scan job:* keys of earlier versions again, even if they were migrated")
+    args = parser.parse_args()
+    try:
+        asyncio.run(main(args.concurrency, args.poll_interval, args.reindex_legacy_jobs))
+    except KeyboardInterrupt:
+        pass
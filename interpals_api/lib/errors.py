@@ -26,6 +26,14 @@ class APITimeoutError(APIError):
     pass
 
 
+class APIConnectionError(APIError):
+    pass
+
+
+class APIServerError(APIError):
+    pass
+
+
 class APIAuthError(APIError):
     pass
 
@@ -0,0 +1,56 @@
+from http.cookiejar import DefaultCookiePolicy
+
+import aiohttp
+import requests
+from requests.adapters import HTTPAdapter
+from urllib3.util.retry import Retry
+
+
+def create_client_session(limit=100, limit_per_host=0, ttl_dns_cache=300,
+                          keepalive_timeout=30.0):
+    """
+    Creates an aiohttp session backed by a pooled TCP connector.
+
+    Cookies are sent explicitly with every request, so the session uses a
+    dummy cookie jar: a pool shared between several interpals sessions must
+    never leak cookies from one account into another.
+    """
+    connector = aiohttp.TCPConnector(
+        limit=limit,
+        limit_per_host=limit_per_host,
+        ttl_dns_cache=ttl_dns_cache,
+        keepalive_timeout=keepalive_timeout,
+    )
+    return aiohttp.ClientSession(
+        connector=connector,
+        cookie_jar=aiohttp.DummyCookieJar(),
+    )
+
+
+def create_requests_session(pool_size=10, max_retries=0):
+    """
+    Creates a requests session with a keep-alive connection pool.
+
+    The adapter only retries failures to connect, up to max_retries times,
+    before anything is sent. Read timeouts and 5xx responses are left to
+    the API retry policy, so that retries are not stacked. As with the
+    aiohttp session, cookies from responses are never stored.
+    """
+    retries = Retry(
+        total=max_retries,
+        connect=max_retries,
+        read=False,
+        status=0,
+        other=0,
+        redirect=False,
+        backoff_factor=0.5,
+        raise_on_status=False,
+    )
+    adapter = HTTPAdapter(pool_connections=pool_size, pool_maxsize=pool_size,
+                          max_retries=retries)
+
+    session = requests.Session()
+    session.mount("https://", adapter)
+    session.mount("http://", adapter)
+    session.cookies.set_policy(DefaultCookiePolicy(allowed_domains=[]))
+    return session
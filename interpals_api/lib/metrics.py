@@ -0,0 +1,165 @@
+import time
+from contextlib import contextmanager
+
+
+DEFAULT_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0,
+                   10.0)
+
+
+def _format_labels(labelnames, values, extra=()):
+    pairs = list(zip(labelnames, values)) + list(extra)
+    if not pairs:
+        return ''
+    return '{' + ','.join(
+        '{}="{}"'.format(name, str(value).replace('\\', '\\\\')
+                         .replace('"', '\\"').replace('\n', '\\n'))
+        for name, value in pairs
+    ) + '}'
+
+
+def _format_value(value):
+    return repr(float(value)) if isinstance(value, float) else str(value)
+
+
+class Counter:
+    type = 'counter'
+
+    def __init__(self, name, documentation, labelnames=()):
+        self.name = name
+        self.documentation = documentation
+        self.labelnames = labelnames
+        self._values = {}
+
+    def inc(self, *labels, amount=1):
+        self._values[labels] = self._values.get(labels, 0) + amount
+
+    def value(self, *labels):
+        return self._values.get(labels, 0)
+
+    def samples(self):
+        for labels, value in sorted(self._values.items()):
+            yield self.name + _format_labels(self.labelnames, labels), value
+
+
+class Histogram:
+    type = 'histogram'
+
+    def __init__(self, name, documentation, labelnames=(),
+                 buckets=DEFAULT_BUCKETS):
+        self.name = name
+        self.documentation = documentation
+        self.labelnames = labelnames
+        self.buckets = tuple(buckets)
+        self._values = {}
+
+    def observe(self, value, *labels):
+        counts, total, count = self._values.get(
+            labels, ([0] * len(self.buckets), 0.0, 0)
+        )
+        for i, bound in enumerate(self.buckets):
+            if value <= bound:
+                counts[i] += 1
+        self._values[labels] = (counts, total + value, count + 1)
+
+    def count(self, *labels):
+        return self._values[labels][2] if labels in self._values else 0
+
+    def samples(self):
+        for labels, (counts, total, count) in sorted(self._values.items()):
+            for bound, bucket_count in zip(self.buckets, counts):
+                yield self.name + '_bucket' + _format_labels(
+                    self.labelnames, labels, [('le', repr(float(bound)))]
+                ), bucket_count
+            yield self.name + '_bucket' + _format_labels(
+                self.labelnames, labels, [('le', '+Inf')]
+            ), count
+            yield self.name + '_sum' + _format_labels(self.labelnames, labels), \
+                total
+            yield self.name + '_count' + _format_labels(self.labelnames, labels), \
+                count
+
+
+class Gauge:
+    type = 'gauge'
+
+    def __init__(self, name, documentation, func):
+        self.name = name
+        self.documentation = documentation
+        self.func = func
+
+    def samples(self):
+        yield self.name, self.func()
+
+
+class MetricsCollector:
+    """
+    In-process metrics of the API client, rendered in the Prometheus text
+    exposition format by render(). Usable without a Prometheus client
+    library or the FastAPI app.
+    """
+
+    def __init__(self, buckets=DEFAULT_BUCKETS):
+        self.requests = Counter(
+            'interpals_requests_total',
+            'HTTP requests to interpals.net by endpoint, method and status.',
+            ('endpoint', 'method', 'status'),
+        )
+        self.request_duration = Histogram(
+            'interpals_request_duration_seconds',
+            'Latency of HTTP requests to interpals.net.',
+            ('endpoint',), buckets,
+        )
+        self.response_bytes = Counter(
+            'interpals_response_bytes_total',
+            'Bytes downloaded from interpals.net.',
+            ('endpoint',),
+        )
+        self.retries = Counter(
+            'interpals_request_retries_total',
+            'Retried HTTP requests to interpals.net.',
+            ('endpoint',),
+        )
+        self.parse_duration = Histogram(
+            'interpals_parse_duration_seconds',
+            'Time spent parsing HTML pages.',
+            ('parser',), buckets,
+        )
+        self._metrics = [self.requests, self.request_duration,
+                         self.response_bytes, self.retries,
+                         self.parse_duration]
+
+    def add_gauge(self, name, documentation, func):
+        """
+        Registers a gauge whose value is read from func() at render time.
+        """
+        self._metrics.append(Gauge(name, documentation, func))
+
+    def observe_request(self, endpoint, method, status, duration, size=0):
+        self.requests.inc(endpoint, method, str(status))
+        self.request_duration.observe(duration, endpoint)
+        if size:
+            self.response_bytes.inc(endpoint, amount=size)
+
+    def observe_retry(self, endpoint):
+        self.retries.inc(endpoint)
+
+    @contextmanager
+    def time_parse(self, parser):
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.parse_duration.observe(time.perf_counter() - start, parser)
+
+    def render(self):
+        lines = []
+        for metric in self._metrics:
+            lines.append('# HELP {} {}'.format(metric.name, metric.documentation))
+            lines.append('# TYPE {} {}'.format(metric.name, metric.type))
+            for sample, value in metric.samples():
+                lines.append('{} {}'.format(sample, _format_value(value)))
+        return '\n'.join(lines) + '\n'
+
+
+# Shared by every ApiAsync instance which is not given its own collector
+default_metrics = MetricsCollector()
@@ -0,0 +1,153 @@
+import asyncio
+import time
+from contextlib import asynccontextmanager
+from urllib.parse import urlparse
+
+# (requests per second, burst) per interpals account, shared by the FastAPI
+# app and the job worker
+RATE_LIMIT_SESSION = (5, 10)
+RATE_LIMIT_ENDPOINTS = {'search': (2, 4), 'pm': (3, 6), 'profile': (3, 6)}
+
+
+class TokenBucket:
+    """
+    Token bucket allowing rate requests per second with bursts of up to
+    burst requests.
+
+    Implemented as a virtual schedule (GCRA): every acquire() reserves the
+    next free slot before sleeping, so concurrent waiters are served in
+    order without a lock. A waiter cancelled before its request is sent
+    gives its slot back.
+    """
+
+    def __init__(self, rate, burst=1):
+        self.rate = rate
+        self.burst = max(burst, 1)
+        self._tat = 0.0
+
+    def reserve(self):
+        """
+        Reserves a token and returns how many seconds to wait for it.
+        """
+        now = time.monotonic()
+        interval = 1.0 / self.rate
+        tat = max(self._tat, now)
+        self._tat = tat + interval
+        return max(0.0, tat - (self.burst - 1) * interval - now)
+
+    def refund(self):
+        """
+        Gives back a token reserved but not used for a request.
+        """
+        self._tat -= 1.0 / self.rate
+
+    async def acquire(self):
+        delay = self.reserve()
+        if delay > 0:
+            try:
+                await asyncio.sleep(delay)
+            except asyncio.CancelledError:
+                self.refund()
+                raise
+
+
+class RateLimiter:
+    """
+    Throttles requests to interpals.net.
+
+    Every session (account) gets a token bucket for all its requests and
+    one per endpoint class ('search', 'pm', 'profile', 'other'), and the
+    number of requests in flight is capped for the whole limiter. Rates
+    are (requests per second, burst) pairs; None means unlimited.
+    """
+
+    def __init__(self, session_rate=None, endpoint_rates=None,
+                 max_in_flight=None):
+        self.session_rate = session_rate
+        self.endpoint_rates = endpoint_rates or {}
+        self.max_in_flight = max_in_flight
+        self._buckets = {}
+        self._semaphore = None
+        self._waiting = 0
+        self._in_flight = 0
+
+    @property
+    def queue_depth(self):
+        """
+        Number of requests waiting for a token or a free slot.
+        """
+        return self._waiting
+
+    @property
+    def in_flight(self):
+        return self._in_flight
+
+    @asynccontextmanager
+    async def limit(self, session_key, endpoint):
+        self._waiting += 1
+        acquired = False
+        reserved = []
+        try:
+            buckets = [
+                self._bucket(session_key, None, self.session_rate),
+                self._bucket(session_key, endpoint,
+                             self.endpoint_rates.get(endpoint)),
+            ]
+            for bucket in buckets:
+                if bucket is not None:
+                    await bucket.acquire()
+                    reserved.append(bucket)
+
+            semaphore = self._get_semaphore()
+            if semaphore is not None:
+                await semaphore.acquire()
+                acquired = True
+        except asyncio.CancelledError:
+            # Cancelled before sending: the tokens taken so far go back
+            for bucket in reserved:
+                bucket.refund()
+            raise
+        finally:
+            self._waiting -= 1
+
+        self._in_flight += 1
+        try:
+            yield
+        finally:
+            self._in_flight -= 1
+            if acquired:
+                semaphore.release()
+
+    def _bucket(self, session_key, endpoint, rate):
+        if rate is None:
+            return None
+        key = (session_key, endpoint)
+        bucket = self._buckets.get(key)
+        if bucket is None:
+            bucket = self._buckets[key] = TokenBucket(*rate)
+        return bucket
+
+    def _get_semaphore(self):
+        if self.max_in_flight and self._semaphore is None:
+            self._semaphore = asyncio.Semaphore(self.max_in_flight)
+        return self._semaphore
+
+
+def endpoint_for(url):
+    """
+    Classifies a request url into the endpoint names used by RateLimiter.
+    """
+    path = urlparse(url).path
+    if not path.startswith("/"):
+        path = "/" + path
+    if path.startswith("/app/search") or path.startswith("/app/async/geoAc"):
+        return 'search'
+    if path.startswith("/pm.php"):
+        return 'pm'
+    if path.startswith("/app/"):
+        return 'other'
+    return 'profile'
+
+
+# Shared by every ApiAsync instance which is not given its own limiter
+default_rate_limiter = RateLimiter()
@@ -0,0 +1,32 @@
+import random
+
+
+class RetryPolicy:
+    """
+    Decides whether a failed request is retried and how long to wait.
+
+    Only methods listed in methods (idempotent ones) are retried, at most
+    attempts times in total, with exponential backoff starting at backoff
+    seconds and capped at max_backoff. With jitter the delay is drawn
+    uniformly from [0, backoff] ("full jitter").
+    """
+
+    def __init__(self, attempts=3, backoff=0.5, max_backoff=10.0, jitter=True,
+                 methods=('get',)):
+        self.attempts = attempts
+        self.backoff = backoff
+        self.max_backoff = max_backoff
+        self.jitter = jitter
+        self.methods = methods
+
+    def should_retry(self, method, attempt):
+        return method in self.methods and attempt < self.attempts
+
+    def delay(self, attempt):
+        delay = min(self.max_backoff, self.backoff * 2 ** (attempt - 1))
+        if self.jitter:
+            delay = random.uniform(0, delay)
+        return delay
+
+
+NO_RETRY = RetryPolicy(attempts=1)
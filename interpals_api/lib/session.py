@@ -2,12 +2,12 @@ import json
 from urllib.parse import urljoin
 
 import requests
-import aiohttp
 
 from ..utils import find_csrf_token
 from .errors import (NoCSRFTokenError, WrongUsernameOrPasswordError,
                      SessionError, TooManyLoginAttemptsError)
 from .cookie import Cookie
+from .http import create_client_session
 
 
 class Session:
@@ -116,16 +116,22 @@ class Session:
 
 class SessionAsync(Session):
     @classmethod
-    async def login(cls, username, password):
+    async def login(cls, username, password, http=None):
+        # One HTTP session for every request of the login, either the
+        # given (shared) one or a temporary one
+        if http is None:
+            async with create_client_session(limit=1) as http:
+                return await cls.login(username, password, http)
+
         # Cookie object
         cookie = Cookie()
 
         # Request initial page
-        csrf_token = await cls._request_initial_page(cookie)
+        csrf_token = await cls._request_initial_page(cookie, http)
 
         # Request login endpoint
         await cls._request_login_endpoint(
-            username, password, cookie, csrf_token
+            username, password, cookie, csrf_token, http
         )
 
         # Create and return session instance
@@ -134,26 +140,25 @@ class SessionAsync(Session):
                    csrf_cookieV2=cookie['csrf_cookieV2'])
 
     @classmethod
-    async def _request_initial_page(cls, cookie):
-        async with aiohttp.ClientSession() as session:
-            async with session.get("https://www.interpals.net/") as resp:
-                # Get initial cookie
-                set_cookie = Cookie.from_response_headers(resp.headers)
-                cookie.update(set_cookie)
+    async def _request_initial_page(cls, cookie, http):
+        async with http.get("https://www.interpals.net/") as resp:
+            # Get initial cookie
+            set_cookie = Cookie.from_response_headers(resp.headers)
+            cookie.update(set_cookie)
 
-                # Extract CSRF token from the HTML
-                text = await resp.text()
-                csrf_token = find_csrf_token(text)
+            # Extract CSRF token from the HTML
+            text = await resp.text()
+            csrf_token = find_csrf_token(text)
 
-                # Raise error if no token found
-                if csrf_token is None:
-                    raise NoCSRFTokenError()
+            # Raise error if no token found
+            if csrf_token is None:
+                raise NoCSRFTokenError()
 
         return csrf_token
 
     @classmethod
     async def _request_login_endpoint(cls, username, password, cookie, 
-                                      csrf_token):
+                                      csrf_token, http):
         headers = {
             'Content-Type': 'application/x-www-form-urlencoded',
             'Cookie': cookie.as_string(),
@@ -166,23 +171,22 @@ class SessionAsync(Session):
         }
 
         # Request login entry point
-        async with aiohttp.ClientSession() as session:
-            async with session.post("https://www.interpals.net/app/auth/login",
-                                    data=data, headers=headers, 
-                                    allow_redirects=False) as resp:
-                # Update cookie
-                set_cookie = Cookie.from_response_headers(resp.headers)
-                cookie.update(set_cookie)
-
-                # Check status
-                if resp.status == 200:
-                    raise WrongUsernameOrPasswordError()
-                elif resp.status == 302:
-                    location = resp.headers['Location']
-                else:
-                    raise SessionError(
-                        f"Unknown response status while login: {resp.status}"
-                    )
+        async with http.post("https://www.interpals.net/app/auth/login",
+                             data=data, headers=headers, 
+                             allow_redirects=False) as resp:
+            # Update cookie
+            set_cookie = Cookie.from_response_headers(resp.headers)
+            cookie.update(set_cookie)
+
+            # Check status
+            if resp.status == 200:
+                raise WrongUsernameOrPasswordError()
+            elif resp.status == 302:
+                location = resp.headers['Location']
+            else:
+                raise SessionError(
+                    f"Unknown response status while login: {resp.status}"
+                )
 
         # Request the location to check success
         url = urljoin("https://www.interpals.net", location)
@@ -190,8 +194,7 @@ class SessionAsync(Session):
             'Content-Type': 'application/x-www-form-urlencoded',
             'Cookie': cookie.as_string(),
         }
-        async with aiohttp.ClientSession() as session:
-            async with session.get(url, headers=headers) as resp:
-                text = await resp.text()
-                if "Too many unsuccessful login attempts." in text:
-                    raise TooManyLoginAttemptsError()
+        async with http.get(url, headers=headers) as resp:
+            text = await resp.text()
+            if "Too many unsuccessful login attempts." in text:
+                raise TooManyLoginAttemptsError()
@@ -0,0 +1,117 @@
+import functools
+import inspect
+from contextlib import contextmanager
+
+
+class Span:
+    """
+    Span handed out by the no-op tracer.
+    """
+
+    def set_attribute(self, key, value):
+        pass
+
+    def end(self):
+        pass
+
+
+class Tracer:
+    """
+    Tracing hook of ApiAsync. It opens one span per public API call, with
+    child spans for every HTTP request and parser invocation.
+
+    This base implementation does nothing; subclasses override span(),
+    and start_span() and use_span() for spans of async generators.
+    """
+
+    @contextmanager
+    def span(self, name, **attributes):
+        yield Span()
+
+    def start_span(self, name, **attributes):
+        """
+        Starts a span without making it current. The caller ends it.
+        """
+        return Span()
+
+    @contextmanager
+    def use_span(self, span):
+        """
+        Makes a span from start_span() current for the duration of the block.
+        """
+        yield span
+
+
+class OpenTelemetryTracer(Tracer):
+    """
+    Tracer reporting spans to OpenTelemetry. Requires the
+    opentelemetry-api package.
+    """
+
+    def __init__(self, tracer=None):
+        if tracer is None:
+            from opentelemetry import trace
+            tracer = trace.get_tracer("interpals_api")
+        self._tracer = tracer
+
+    @contextmanager
+    def span(self, name, **attributes):
+        attributes = {key: value for key, value in attributes.items()
+                      if value is not None}
+        with self._tracer.start_as_current_span(name, attributes=attributes) \
+                as span:
+            yield span
+
+    def start_span(self, name, **attributes):
+        attributes = {key: value for key, value in attributes.items()
+                      if value is not None}
+        return self._tracer.start_span(name, attributes=attributes)
+
+    @contextmanager
+    def use_span(self, span):
+        from opentelemetry import trace
+        with trace.use_span(span, end_on_exit=False):
+            yield span
+
+
+def traced(func):
+    """
+    Runs an ApiAsync coroutine or async generator method inside a span of
+    the instance's tracer, named after the method.
+
+    The span of an async generator is only current while the generator runs
+    up to its next item, so that spans the caller opens between two items
+    are not taken for its children.
+    """
+    name = "ApiAsync.{}".format(func.__name__)
+
+    if inspect.isasyncgenfunction(func):
+        @functools.wraps(func)
+        async def wrapper(self, *args, **kwargs):
+            items = func(self, *args, **kwargs)
+            span = self._tracer.start_span(name)
+            try:
+                while True:
+                    with self._tracer.use_span(span):
+                        try:
+                            item = await items.__anext__()
+                        except StopAsyncIteration:
+                            break
+                    yield item
+            finally:
+                try:
+                    with self._tracer.use_span(span):
+                        await items.aclose()
+                finally:
+                    span.end()
+    else:
+        @functools.wraps(func)
+        async def wrapper(self, *args, **kwargs):
+            with self._tracer.span(name):
+                return await func(self, *args, **kwargs)
+
+    return wrapper
+
+
+# Used by every ApiAsync instance which is not given its own tracer
+default_tracer = Tracer()
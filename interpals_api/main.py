@@ -1,16 +1,59 @@
-from fastapi import FastAPI, HTTPException, Depends, Header
+from contextlib import asynccontextmanager
+from fastapi import FastAPI, HTTPException, Depends, Header, Query
 from fastapi.middleware.cors import CORSMiddleware
+from fastapi.responses import StreamingResponse, PlainTextResponse
 from typing import Optional
 from pydantic import BaseModel
-from .job.job_configurations import REDIS_JOB_BASE_KEY, JobConfigRequest, add_cron_job, get_cron_jobs
-from .job.models import SearchOptions
-from .store.store import redis_client
+from .job.job_configurations import (JobConfigRequest, account_session_key, add_cron_job, get_cron_jobs, delete_cron_job,
+                                     index_legacy_jobs)
+from .job.models import MAX_SEARCH_CONCURRENCY, SearchOptions
+from .store.store import async_redis_client
+from .store.memory import MemoryStore
 from uuid import uuid4
-from .lib.session import Session
+import json
+from .lib.session import Session, SessionAsync
 from .api import ApiAsync
+from .seen_users import seen_for_search
+from .lib.http import create_client_session
+from .lib.ratelimit import RATE_LIMIT_ENDPOINTS, RATE_LIMIT_SESSION, RateLimiter
+from .lib.metrics import default_metrics
+from .lib.tracing import OpenTelemetryTracer, default_tracer
+from .configs import Config
 
 SESSION_EXPIRE_TIME = 7200  # todo- find out how long interpal's sessions typically last and ajust this value accordingly
-app = FastAPI(title="Interpals API", description="API for Interpals social network")
+HTTP_POOL_LIMIT = 100
+HTTP_POOL_LIMIT_PER_HOST = 50
+SESSION_CACHE_SIZE = 1024
+SESSION_CACHE_TTL = 300  # bounds how long a logout in another worker process can go unnoticed
+PROFILE_CACHE_TTL = 600
+MAX_REQUESTS_IN_FLIGHT = 64
+
+http_pool = None
+rate_limiter = RateLimiter(RATE_LIMIT_SESSION, RATE_LIMIT_ENDPOINTS, MAX_REQUESTS_IN_FLIGHT)
+tracer = OpenTelemetryTracer() if Config.OTEL_TRACING else default_tracer
+default_metrics.add_gauge("interpals_rate_limiter_queue_depth", "Requests waiting for the rate limiter.",
+                          lambda: rate_limiter.queue_depth)
+default_metrics.add_gauge("interpals_requests_in_flight", "Requests to interpals.net in flight.",
+                          lambda: rate_limiter.in_flight)
+# Resolved ApiAsync instances by auth token, so hot tokens skip Redis
+session_cache = MemoryStore(max_size=SESSION_CACHE_SIZE)
+
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    # One connection pool to interpals.net is shared by every request
+    global http_pool
+    http_pool = create_client_session(limit=HTTP_POOL_LIMIT, limit_per_host=HTTP_POOL_LIMIT_PER_HOST)
+    await async_redis_client.ping()
+    await index_legacy_jobs()
+    try:
+        yield
+    finally:
+        session_cache.clear()
+        await http_pool.close()
+        http_pool = None
+        await async_redis_client.aclose()
+
+app = FastAPI(title="Interpals API", description="API for Interpals social network", lifespan=lifespan)
 
 origins = ['*']
 
@@ -38,30 +81,63 @@ async def get_api(x_auth_token: str = Header(..., alias="x-auth-token")) -> ApiA
     """
     Dependency that retrieves the ApiAsync instance using a session from Redis
     """
-    data = redis_client.get(f"session:{x_auth_token}")
+    api = session_cache.get(x_auth_token)
+    if api is not None:
+        return api
+
+    key = f"session:{x_auth_token}"
+    try:
+        async with async_redis_client.pipeline() as batch:
+            batch.get(key)
+            batch.ttl(key)
+        data, expire = batch.results
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=f"Error reading session: {str(e)}")
     
     if not data:
         raise HTTPException(status_code=401, detail="Not authenticated or session expired")
     
     session = Session(data["username"], data["session_id"], data["csrf_cookie"])
+    api = ApiAsync(session, http=http_pool, cache=async_redis_client, profile_ttl=PROFILE_CACHE_TTL,
+                   rate_limiter=rate_limiter, tracer=tracer)
+
+    # Never keep the session cached longer than it lives in Redis; -2 means it is already gone
+    if expire != -2:
+        session_cache.set(x_auth_token, api, min(expire, SESSION_CACHE_TTL) if expire > 0 else SESSION_CACHE_TTL)
     
-    return ApiAsync(session)
+    return api
+
+def search_seen_options(options_dict: dict, api: ApiAsync):
+    """
+    Pops skip_seen and stop_after_seen_pages from the search options and returns the seen set
+    of the account's query (or None) and stop_after_seen_pages.
+    """
+    skip_seen = options_dict.pop("skip_seen", False)
+    stop_after_seen_pages = options_dict.pop("stop_after_seen_pages", None)
+    if not skip_seen:
+        return None, None
+    return seen_for_search(async_redis_client, api._session.username, options_dict), stop_after_seen_pages
+
+@app.get("/metrics")
+async def metrics():
+    return PlainTextResponse(default_metrics.render(), media_type="text/plain; version=0.0.4")
 
 @app.post("/login")
 async def login(request: LoginRequest):
     # I should encrypt the password with a key for security before pushing, frontend will send encrypted key which will be decrypted here.
-    session = Session.login(request.username, request.password)
-    api = ApiAsync(session)
+    session = await SessionAsync.login(request.username, request.password, http=http_pool)
+    api = ApiAsync(session, http=http_pool, cache=async_redis_client, profile_ttl=PROFILE_CACHE_TTL,
+                   rate_limiter=rate_limiter, tracer=tracer)
     try:
         authenticated = await api.check_auth()
         if authenticated:
             token = str(uuid4())
             session_credentials = {"username": session.username, "session_id": session.interpals_sessid, "csrf_cookie": session.csrf_cookieV2}
-            redis_client.set(
-                f"session:{token}", 
-                (session_credentials),
-                SESSION_EXPIRE_TIME,
-            )
+            async with async_redis_client.pipeline() as batch:
+                batch.set(f"session:{token}", session_credentials, SESSION_EXPIRE_TIME)
+                # Scheduled jobs of the account run with its latest session
+                batch.set(account_session_key(session.username), token, SESSION_EXPIRE_TIME)
+            session_cache.set(token, api, SESSION_CACHE_TTL)
             
             return {
                 "status": "success", 
@@ -74,9 +150,14 @@ async def login(request: LoginRequest):
         raise HTTPException(status_code=500, detail=f"Login error: {str(e)}")
 
 @app.get("/profile/{username}")
-async def get_profile(username: str, api: ApiAsync = Depends(get_api)):
+async def get_profile(
+    username: str,
+    max_age: Optional[int] = None,
+    force_refresh: bool = False,
+    api: ApiAsync = Depends(get_api)
+):
     try:
-        profile_data = await api.profile(username)
+        profile_data = await api.profile(username, max_age=max_age, force_refresh=force_refresh)
         return profile_data
     except Exception as e:
         raise HTTPException(status_code=404, detail=f"Profile error: {str(e)}")
@@ -96,15 +177,42 @@ async def search(options: SearchOptions, api: ApiAsync = Depends(get_api)):
         options_dict = options.model_dump(exclude_none=True)
         limit = options_dict.pop("limit", 1000)
         timeout = options_dict.pop("timeout", 0.0)
+        concurrency = options_dict.pop("concurrency", 1)
+        seen, stop_after_seen_pages = search_seen_options(options_dict, api)
         
         results = []
-        async for user in api.search(options_dict, limit=limit, timeout=timeout):
+        async for user in api.search(options_dict, limit=limit, timeout=timeout, concurrency=concurrency,
+                                     seen=seen, stop_after_seen_pages=stop_after_seen_pages):
             results.append(user)
             
         return {"users": results}
     except Exception as e:
         raise HTTPException(status_code=500, detail=f"Search error: {str(e)}")
 
+@app.post("/search/stream")
+async def search_stream(options: SearchOptions, api: ApiAsync = Depends(get_api)):
+    """
+    Streams search results as NDJSON, one user per line, as soon as each
+    result page is parsed. The next page is only requested once the client
+    has consumed the previous lines.
+    """
+    options_dict = options.model_dump(exclude_none=True)
+    limit = options_dict.pop("limit", 1000)
+    timeout = options_dict.pop("timeout", 0.0)
+    concurrency = options_dict.pop("concurrency", 1)
+    seen, stop_after_seen_pages = search_seen_options(options_dict, api)
+
+    async def generate():
+        try:
+            async for user in api.search(options_dict, limit=limit, timeout=timeout, concurrency=concurrency,
+                                         seen=seen, stop_after_seen_pages=stop_after_seen_pages):
+                yield json.dumps(user) + "\n"
+        except Exception as e:
+            # Headers are already sent, so the error goes into the stream
+            yield json.dumps({"error": f"Search error: {str(e)}"}) + "\n"
+
+    return StreamingResponse(generate(), media_type="application/x-ndjson")
+
 @app.get("/view/{username}")
 async def view_profile(username: str, api: ApiAsync = Depends(get_api)):
     try:
@@ -114,9 +222,10 @@ async def view_profile(username: str, api: ApiAsync = Depends(get_api)):
         raise HTTPException(status_code=500, detail=f"View error: {str(e)}")
 
 @app.get("/chats")
-async def get_chats(count: int = 9, offset: int = 0, api: ApiAsync = Depends(get_api)):
+async def get_chats(count: int = 9, offset: int = 0,
+                    concurrency: int = Query(1, ge=1, le=MAX_SEARCH_CONCURRENCY), api: ApiAsync = Depends(get_api)):
     try:
-        chats = await api.chat(count=count, offset=offset)
+        chats = await api.chat(count=count, offset=offset, concurrency=concurrency)
         return chats
     except Exception as e:
         raise HTTPException(status_code=500, detail=f"Error getting chats: {str(e)}")
@@ -206,8 +315,8 @@ async def get_pictures(uid: str, aid: str, api: ApiAsync = Depends(get_api)):
         raise HTTPException(status_code=500, detail=f"Error getting pictures: {str(e)}")
 
 @app.post("/job")
-async def create_job(request: JobConfigRequest, _: ApiAsync = Depends(get_api)):
-    name = await add_cron_job(request)
+async def create_job(request: JobConfigRequest, api: ApiAsync = Depends(get_api)):
+    name = await add_cron_job(request, api._session.username)
     return {"message": "Job added successfully", "job_name": name}
 
 
@@ -218,17 +327,23 @@ async def list_jobs(_: ApiAsync = Depends(get_api)):
 
 @app.delete("/job/{job_name}")
 async def delete_job(job_name: str, _: ApiAsync = Depends(get_api)):
-    try:
-        redis_client.delete(f"{REDIS_JOB_BASE_KEY}:{job_name}")
-        return {"message": f"Job '{job_name}' deleted successfully"}
-    except Exception as e:
-        raise HTTPException(status_code=500, detail=f"Failed to delete job: {str(e)}")
+    if not await delete_cron_job(job_name):
+        raise HTTPException(status_code=404, detail=f"Job '{job_name}' not found")
+    return {"message": f"Job '{job_name}' deleted successfully"}
 
 
 @app.post("/logout")
 async def logout(x_auth_token: str = Header(..., alias="x-auth-token")):
     try:
-        redis_client.delete(x_auth_token)
+        key = f"session:{x_auth_token}"
+        data = await async_redis_client.get(key)
+        await async_redis_client.delete(key)
+        session_cache.delete(x_auth_token)
+        if data:
+            # Jobs lose the session only if it is still the latest one of the account
+            account_key = account_session_key(data["username"])
+            if await async_redis_client.get(account_key) == x_auth_token:
+                await async_redis_client.delete(account_key)
         return {"status": "success", "message": "logged out successfully"}
     except Exception as e:
         raise HTTPException(status_code=500, detail=f"Error logging out: {str(e)}")
\ No newline at end of file
@@ -1,16 +1,44 @@
+import re
+from html import unescape
+from typing import NamedTuple
+
 from bs4 import BeautifulSoup
 
+re_threads_left = re.compile(
+    r'<div\b[^>]*\bid=["\']threads_left["\'][^>]*>', re.IGNORECASE
+)
+re_max_msg_id = re.compile(r'\bdata-max-msg-id=["\']([^"\']*)["\']')
+re_pm_new_cnt = re.compile(
+    r'<span\b[^>]*\bid=["\']pmNewCnt["\'][^>]*>([^<]*)</span>', re.IGNORECASE
+)
+
+
+class InboxHeader(NamedTuple):
+    max_msg_id: str
+    unread: int
+
 
 class ChatParser:
+    def parse_inbox(self, body):
+        """
+        Extracts max_msg_id and the unread counter from /pm.php.
+
+        Both values are read with regular expressions without building a
+        DOM; the page is parsed with BeautifulSoup, once, only when the
+        markup does not match.
+        """
+        header = self._parse_inbox_fast(body)
+        if header is None:
+            soup = BeautifulSoup(body, "lxml")
+            header = InboxHeader(self._find_maxmsgid(soup),
+                                 self._find_unread(soup))
+        return header
+
     def parse_maxmsgid(self, body):
-        soup = BeautifulSoup(body, "lxml")
-        maxmsgid = soup.find('div', id='threads_left')['data-max-msg-id']
-        return maxmsgid
+        return self.parse_inbox(body).max_msg_id
 
     def parse_unread(self, body):
-        soup = BeautifulSoup(body, "lxml")
-        unread = soup.find('span', id='pmNewCnt').text.strip()
-        return int(unread[2:-1]) if unread else 0
+        return self.parse_inbox(body).unread
 
     def parse_chat(self, body):
         soup = BeautifulSoup(body, "lxml")
@@ -51,6 +79,29 @@ class ChatParser:
 
         return messages
 
+    def _parse_inbox_fast(self, body):
+        threads_left = re_threads_left.search(body)
+        if threads_left is None:
+            return None
+        max_msg_id = re_max_msg_id.search(threads_left.group(0))
+        pm_new_cnt = re_pm_new_cnt.search(body)
+        if max_msg_id is None or pm_new_cnt is None:
+            return None
+
+        unread = unescape(pm_new_cnt.group(1)).strip()
+        return InboxHeader(unescape(max_msg_id.group(1)),
+                           self._unread_count(unread))
+
+    def _find_maxmsgid(self, soup):
+        return soup.find('div', id='threads_left')['data-max-msg-id']
+
+    def _find_unread(self, soup):
+        unread = soup.find('span', id='pmNewCnt').text.strip()
+        return self._unread_count(unread)
+
+    def _unread_count(self, unread):
+        return int(unread[2:-1]) if unread else 0
+
     def _parse_thread_info(self, element):
         data = {}
         data['new'] = 'new' in element['class']
@@ -0,0 +1,117 @@
+from lxml import etree, html
+
+
+def _class_test(name):
+    return "contains(concat(' ', normalize-space(@class), ' '), ' {} ')" \
+        .format(name)
+
+
+def _first(path):
+    return etree.XPath("({})[1]".format(path))
+
+
+class SearchParser:
+    """
+    Fast parser for /app/search result pages.
+
+    The page is parsed once with lxml and every field is read with
+    precompiled XPath expressions. The result is the same as the
+    BeautifulSoup based Api._parse_search_result; whenever a block cannot
+    be parsed the same way, ValueError is raised so that the caller can
+    fall back to the BeautifulSoup path.
+    """
+
+    _results = etree.XPath("//div[{}]".format(_class_test('sResInner')))
+    _main = _first(".//div[{}]".format(_class_test('sResMain')))
+    _bold = _first(".//b")
+    _link = _first(".//a")
+    _href_links = etree.XPath(".//a[@href]")
+    _sex_img = _first(".//img[{}]".format(_class_test('sResSex')))
+    _thumb = _first(".//a[{}]".format(_class_test('sResThumb')))
+    _img = _first(".//img")
+    _joined = _first(".//div[{}]".format(_class_test('sResJoined')))
+    _last_online = _first(".//div[{}]".format(_class_test('sResLastOnline')))
+    _main_txt = _first(".//div[{}]".format(_class_test('sResMainTxt')))
+    _txt_field = _first(".//div[{}]".format(_class_test('sResTxtField')))
+
+    def parse(self, body):
+        try:
+            root = html.fromstring(body)
+        except (etree.ParserError, ValueError) as e:
+            raise ValueError(f"Could not parse search page: {e}")
+
+        return [self._parse_item(item) for item in self._results(root)]
+
+    def _parse_item(self, item):
+        main = self._one(self._main, item)
+
+        username = ''
+        if main is not None:
+            bold = self._one(self._bold, main)
+            if bold is None:
+                raise ValueError("No username in a user block")
+            username_tag = self._one(self._link, bold)
+            if username_tag is not None:
+                username = username_tag.text_content().strip()
+
+        gender = 'Unknown'
+        sex_img = self._one(self._sex_img, item)
+        if sex_img is not None:
+            src = self._attr(sex_img, 'src').lower()
+            if 'male' in src:
+                gender = 'Male'
+            elif 'female' in src:
+                gender = 'Female'
+
+        location_city = ''
+        location_country = ''
+        location_links = self._href_links(main) if main is not None else []
+        for tag in location_links:
+            href = tag.get('href')
+            if 'city=' in href:
+                location_city = tag.text_content().strip()
+            elif 'countries[]=' in href:
+                location_country = tag.text_content().strip()
+
+        profile_img = ''
+        thumb = self._one(self._thumb, item)
+        if thumb is not None:
+            img = self._one(self._img, thumb)
+            if img is not None:
+                profile_img = self._attr(img, 'src')
+
+        joined_tag = self._one(self._joined, item)
+        joined = joined_tag.text_content().strip() \
+            if joined_tag is not None else ''
+
+        status_tag = self._one(self._last_online, item)
+        online_now = 'Online now' in status_tag.text_content() \
+            if status_tag is not None else False
+
+        description = ''
+        description_tag = self._one(self._main_txt, item)
+        if description_tag is not None:
+            description_field = self._one(self._txt_field, description_tag)
+            if description_field is not None:
+                description = description_field.text_content().strip()
+
+        return {
+            'username': username,
+            'gender': gender,
+            'location_city': location_city,
+            'location_country': location_country,
+            'joined': joined,
+            'online_now': online_now,
+            'profile_image': profile_img,
+            'description': description,
+        }
+
+    def _one(self, xpath, element):
+        found = xpath(element)
+        return found[0] if found else None
+
+    def _attr(self, element, name):
+        value = element.get(name)
+        if value is None:
+            raise ValueError(f"No '{name}' attribute in a user block")
+        return value
@@ -0,0 +1,128 @@
+import hashlib
+import json
+import math
+
+# Search options which change how a search runs or in which order users come,
+# but not which users match
+SEARCH_RUN_OPTIONS = ('limit', 'timeout', 'concurrency', 'sort', 'skip_seen',
+                      'stop_after_seen_pages')
+SEEN_EXPIRE_TIME = 30 * 24 * 3600
+
+
+def search_options_hash(options):
+    """
+    Hashes the search options which select users, so that the same query
+    gets the same hash whatever the order of its lists or run options.
+    """
+    normalized = {}
+    for key, value in options.items():
+        if key in SEARCH_RUN_OPTIONS or value is None:
+            continue
+        if isinstance(value, (list, tuple, set)):
+            value = sorted(str(getattr(item, 'value', item)) for item in value)
+        else:
+            value = getattr(value, 'value', value)
+        normalized[key] = value
+    data = json.dumps(normalized, sort_keys=True, default=str)
+    return hashlib.sha1(data.encode('utf-8')).hexdigest()
+
+
+def search_seen_key(account, options):
+    return "search_seen:{}:{}".format(account.lower(), search_options_hash(options))
+
+
+class SeenSet:
+    """
+    Usernames already returned by a search, kept in a Redis set. Exact, but
+    the set grows with every user seen; SeenBloomFilter stays bounded.
+
+    Usernames are compared case-insensitively. The key expires expire
+    seconds after the last add().
+    """
+
+    def __init__(self, redis, key, expire=SEEN_EXPIRE_TIME):
+        self._client = redis.client
+        self.key = key
+        self.expire = expire
+
+    async def filter_new(self, usernames):
+        """
+        Returns the usernames which were not seen yet, in the given order.
+        """
+        if not usernames:
+            return []
+        flags = await self._client.smismember(
+            self.key, [username.lower() for username in usernames]
+        )
+        return [username for username, flag in zip(usernames, flags) if not flag]
+
+    async def add(self, usernames):
+        if not usernames:
+            return
+        async with self._client.pipeline(transaction=False) as pipe:
+            pipe.sadd(self.key, *[username.lower() for username in usernames])
+            if self.expire:
+                pipe.expire(self.key, self.expire)
+            await pipe.execute()
+
+    async def clear(self):
+        await self._client.delete(self.key)
+
+
+class SeenBloomFilter(SeenSet):
+    """
+    Bloom filter variant of SeenSet for large volumes, kept in a Redis
+    bitmap of fixed size. A new user is taken for seen with probability
+    error_rate once capacity users were added; a seen user is never taken
+    for new.
+    """
+
+    def __init__(self, redis, key, capacity=1000000, error_rate=0.001,
+                 expire=SEEN_EXPIRE_TIME):
+        super().__init__(redis, key, expire)
+        self.size = math.ceil(-capacity * math.log(error_rate) / math.log(2) ** 2)
+        self.hashes = max(1, round(self.size / capacity * math.log(2)))
+
+    async def filter_new(self, usernames):
+        if not usernames:
+            return []
+        async with self._client.pipeline(transaction=False) as pipe:
+            for username in usernames:
+                for position in self._positions(username):
+                    pipe.getbit(self.key, position)
+            bits = await pipe.execute()
+
+        return [
+            username for i, username in enumerate(usernames)
+            if not all(bits[i * self.hashes:(i + 1) * self.hashes])
+        ]
+
+    async def add(self, usernames):
+        if not usernames:
+            return
+        async with self._client.pipeline(transaction=False) as pipe:
+            for username in usernames:
+                for position in self._positions(username):
+                    pipe.setbit(self.key, position, 1)
+            if self.expire:
+                pipe.expire(self.key, self.expire)
+            await pipe.execute()
+
+    def _positions(self, username):
+        # Double hashing: k positions out of two 64 bit hashes
+        digest = hashlib.blake2b(username.lower().encode('utf-8'),
+                                 digest_size=16).digest()
+        h1 = int.from_bytes(digest[:8], 'little')
+        h2 = int.from_bytes(digest[8:], 'little') | 1
+        return [(h1 + i * h2) % self.size for i in range(self.hashes)]
+
+
+def seen_for_search(redis, account, options, bloom=False):
+    """
+    Returns the seen structure of the account's query, a SeenSet or with
+    bloom set a SeenBloomFilter.
+    """
+    key = search_seen_key(account, options)
+    if bloom:
+        return SeenBloomFilter(redis, key + ":bloom")
+    return SeenSet(redis, key)
@@ -0,0 +1,171 @@
+import json
+import zlib
+from typing import Any, Dict, Optional
+
+# Stored values in any format but plain JSON start with this byte and the codec id
+HEADER = b"\x00"
+
+
+class CodecError(ValueError):
+    pass
+
+
+class Codec:
+    """
+    Serialization format of values stored in Redis. The id is written into the
+    header of stored values, so it must never change for a format.
+    """
+
+    id = None
+    name = None
+
+    def encode(self, value: Any) -> bytes:
+        raise NotImplementedError
+
+    def decode(self, data: bytes) -> Any:
+        raise NotImplementedError
+
+
+class JsonCodec(Codec):
+    id = 0x01
+    name = "json"
+
+    def encode(self, value: Any) -> bytes:
+        return json.dumps(value, separators=(",", ":")).encode("utf-8")
+
+    def decode(self, data: bytes) -> Any:
+        return json.loads(data)
+
+
+class MsgpackCodec(Codec):
+    """
+    MessagePack format. Requires the msgpack package.
+    """
+
+    id = 0x02
+    name = "msgpack"
+
+    def __init__(self):
+        import msgpack
+        self._msgpack = msgpack
+
+    def encode(self, value: Any) -> bytes:
+        return self._msgpack.packb(value, use_bin_type=True)
+
+    def decode(self, data: bytes) -> Any:
+        return self._msgpack.unpackb(data, raw=False)
+
+
+class ZlibCodec(Codec):
+    """
+    Compresses the output of another codec (JSON by default) with zlib.
+    """
+
+    compression = 0x10
+
+    def __init__(self, codec: Optional[Codec] = None, level: int = 6):
+        self.codec = codec or JsonCodec()
+        self.level = level
+        self.id = self.compression | self.codec.id
+        self.name = f"zlib+{self.codec.name}"
+
+    def encode(self, value: Any) -> bytes:
+        return zlib.compress(self.codec.encode(value), self.level)
+
+    def decode(self, data: bytes) -> Any:
+        return self.codec.decode(zlib.decompress(data))
+
+
+class ZstdCodec(Codec):
+    """
+    Compresses the output of another codec (JSON by default) with Zstandard.
+    Requires the zstandard package.
+    """
+
+    compression = 0x20
+
+    def __init__(self, codec: Optional[Codec] = None, level: int = 3):
+        import zstandard
+        self.codec = codec or JsonCodec()
+        self.id = self.compression | self.codec.id
+        self.name = f"zstd+{self.codec.name}"
+        self._compressor = zstandard.ZstdCompressor(level=level)
+        self._decompressor = zstandard.ZstdDecompressor()
+
+    def encode(self, value: Any) -> bytes:
+        return self._compressor.compress(self.codec.encode(value))
+
+    def decode(self, data: bytes) -> Any:
+        return self.codec.decode(self._decompressor.decompress(data))
+
+
+_FORMATS = {JsonCodec.id: JsonCodec, MsgpackCodec.id: MsgpackCodec}
+_COMPRESSIONS = {0: None, ZlibCodec.compression: ZlibCodec, ZstdCodec.compression: ZstdCodec}
+
+
+def codec_from_id(codec_id: int) -> Codec:
+    """
+    Creates the codec with the given id.
+
+    :raises CodecError: If the id is unknown or the codec's package is not installed
+    """
+    fmt = _FORMATS.get(codec_id & 0x0F)
+    compression = _COMPRESSIONS.get(codec_id & 0xF0, False)
+    if fmt is None or compression is False:
+        raise CodecError(f"Unknown codec id: {codec_id:#04x}")
+    try:
+        return compression(fmt()) if compression else fmt()
+    except ImportError as e:
+        raise CodecError(f"Codec {codec_id:#04x} is not available: {e}")
+
+
+class CodecRegistry:
+    """
+    Chooses the codec of every key by its namespace, the part of the key
+    before the first ':', e.g. {"profile": ZlibCodec()}.
+
+    JSON values are stored as plain JSON, as they were before codecs existed.
+    Other codecs prefix their output with a zero byte and the codec id. Reads
+    only look at that header, so values in every format can be read whatever
+    the configured codecs are, and a namespace can switch formats without
+    flushing its keys.
+    """
+
+    def __init__(self, default: Optional[Codec] = None, namespaces: Optional[Dict[str, Codec]] = None):
+        self.default = default or JsonCodec()
+        self.namespaces = dict(namespaces or {})
+        self._codecs = {codec.id: codec for codec in [self.default, *self.namespaces.values()]}
+
+    def codec_for(self, key: str) -> Codec:
+        return self.namespaces.get(key.split(":", 1)[0], self.default)
+
+    def encode(self, key: str, value: Any) -> bytes:
+        codec = self.codec_for(key)
+        data = codec.encode(value)
+        if codec.id == JsonCodec.id:
+            return data
+        return HEADER + bytes([codec.id]) + data
+
+    def decode(self, data: bytes) -> Any:
+        """
+        :raises CodecError: If the value cannot be decoded
+        """
+        if isinstance(data, str):
+            data = data.encode("utf-8")
+        if data[:1] != HEADER:
+            codec, payload = self._codec(JsonCodec.id), data
+        elif len(data) < 2:
+            raise CodecError("Truncated codec header")
+        else:
+            codec, payload = self._codec(data[1]), data[2:]
+
+        try:
+            return codec.decode(payload)
+        except Exception as e:
+            raise CodecError(f"Failed to decode {codec.name} value: {e}")
+
+    def _codec(self, codec_id: int) -> Codec:
+        codec = self._codecs.get(codec_id)
+        if codec is None:
+            codec = self._codecs[codec_id] = codec_from_id(codec_id)
+        return codec
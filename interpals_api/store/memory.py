@@ -0,0 +1,99 @@
+import json
+import time
+from collections import OrderedDict
+from typing import Optional, Any, Dict, List, Union
+
+
+class MemoryStore:
+    """
+    In-process key-value store with the same set/get/mget/set_many/delete
+    surface as RedisClient. Values are kept as is, without serialization.
+
+    With max_size set, the least recently used keys are evicted once the
+    store holds more than max_size keys.
+    """
+
+    def __init__(self, max_size: Optional[int] = None):
+        self.max_size = max_size
+        self._data = OrderedDict()
+
+    def __len__(self):
+        return len(self._data)
+
+    def set(self, key: str, value: Any, expire: Optional[int] = None) -> bool:
+        """
+        Stores a key-value pair. Optionally set an expiration time (in seconds).
+        """
+        expires_at = time.monotonic() + expire if expire else None
+        self._data[key] = (value, expires_at)
+        self._data.move_to_end(key)
+        if self.max_size is not None:
+            while len(self._data) > self.max_size:
+                self._data.popitem(last=False)
+        return True
+
+    def get(self, key: str) -> Optional[Any]:
+        """
+        Retrieves a value by key. Returns None if not found or expired.
+        """
+        item = self._data.get(key)
+        if item is None:
+            return None
+        value, expires_at = item
+        if expires_at is not None and expires_at <= time.monotonic():
+            del self._data[key]
+            return None
+        self._data.move_to_end(key)
+        return value
+
+    def mget(self, keys: List[str]) -> List[Optional[Any]]:
+        """
+        Retrieves the values of several keys. Missing keys are None.
+        """
+        return [self.get(key) for key in keys]
+
+    def set_many(self, values: Dict[str, Any], expire: Union[int, Dict[str, Optional[int]], None] = None) -> bool:
+        """
+        Stores several key-value pairs. expire is either one expiration time (in seconds)
+        for every key or a dict of per-key expiration times.
+        """
+        for key, value in values.items():
+            self.set(key, value, expire.get(key) if isinstance(expire, dict) else expire)
+        return True
+
+    def delete(self, key: str) -> bool:
+        """
+        Delete value of key.
+        """
+        self._data.pop(key, None)
+        return True
+
+    def clear(self) -> None:
+        """
+        Delete all keys.
+        """
+        self._data.clear()
+
+    def dump(self, f) -> None:
+        """
+        Saves the keys which did not expire into a file as JSON, so that
+        they can be loaded by another process. Values must be JSON
+        serializable.
+        """
+        now = time.monotonic()
+        items = {
+            key: [value, expires_at - now if expires_at is not None else None]
+            for key, (value, expires_at) in self._data.items()
+            if expires_at is None or expires_at > now
+        }
+        json.dump(items, f)
+
+    @classmethod
+    def load(cls, f, max_size: Optional[int] = None) -> "MemoryStore":
+        """
+        Creates a store from a file saved by dump().
+        """
+        obj = cls(max_size=max_size)
+        for key, (value, expire) in json.load(f).items():
+            obj.set(key, value, expire)
+        return obj
@@ -1,13 +1,91 @@
 import redis
-import json
-from typing import Optional, Any
+import redis.asyncio
+from contextlib import contextmanager, asynccontextmanager
+from typing import Optional, Any, Dict, List, Union
+from .codecs import CodecError, CodecRegistry, ZlibCodec
 from ..configs import Config
 
+SCAN_COUNT = 500
+# Keys per MGET when reading many keys, so a single reply stays reasonably small
+MGET_CHUNK_SIZE = 500
+
+
+# Parsed profiles and job results are large and repetitive, everything else stays plain JSON
+DEFAULT_CODECS = CodecRegistry(namespaces={
+    "profile": ZlibCodec(),
+    "job_result": ZlibCodec(),
+})
+
+
+def _loads(codecs: CodecRegistry, value: Optional[bytes]) -> Optional[Any]:
+    if value is None:
+        return None
+    try:
+        return codecs.decode(value)
+    except CodecError:
+        return None
+
+
+def _expire_for(expire: Union[int, Dict[str, Optional[int]], None], key: str) -> Optional[int]:
+    return expire.get(key) if isinstance(expire, dict) else expire
+
+
+class RedisBatch:
+    """
+    Commands queued on a Redis pipeline, with values encoded like RedisClient.set/get.
+    Once the pipeline block exits, results holds one decoded reply per queued command.
+    """
+
+    def __init__(self, pipe, codecs: CodecRegistry):
+        self._pipe = pipe
+        self._codecs = codecs
+        self._decoders = []
+        self.results = None
+
+    def set(self, key: str, value: Any, expire: Optional[int] = None) -> None:
+        self._pipe.set(name=key, value=self._codecs.encode(key, value), ex=expire)
+        self._decoders.append(bool)
+
+    def set_if_absent(self, key: str, value: Any, expire: Optional[int] = None) -> None:
+        self._pipe.set(name=key, value=self._codecs.encode(key, value), ex=expire, nx=True)
+        self._decoders.append(bool)
+
+    def get(self, key: str) -> None:
+        self._pipe.get(name=key)
+        self._decoders.append(lambda value: _loads(self._codecs, value))
+
+    def mget(self, keys: List[str]) -> None:
+        self._pipe.mget(keys)
+        self._decoders.append(lambda values: [_loads(self._codecs, value) for value in values])
+
+    def delete(self, *keys: str) -> None:
+        self._pipe.delete(*keys)
+        self._decoders.append(int)
+
+    def expire(self, key: str, expire: int) -> None:
+        self._pipe.expire(key, expire)
+        self._decoders.append(bool)
+
+    def ttl(self, key: str) -> None:
+        self._pipe.ttl(key)
+        self._decoders.append(int)
+
+    def _finish(self, replies: list) -> None:
+        self.results = [decode(reply) for decode, reply in zip(self._decoders, replies)]
+
 
 class RedisClient:
-    def __init__(self, host: str = 'localhost', port: int = 6379, password: Optional[str] = None, db: int = 0):
+    """
+    Redis client storing values through codecs (DEFAULT_CODECS unless given): plain JSON by
+    default, compressed or binary formats for the namespaces configured in the registry.
+    Responses are not decoded by redis-py, so keys returned by Redis are decoded here.
+    """
+
+    def __init__(self, host: str = 'localhost', port: int = 6379, password: Optional[str] = None, db: int = 0,
+                 codecs: Optional[CodecRegistry] = None):
+        self.codecs = codecs or DEFAULT_CODECS
         try:
-            self.client = redis.Redis(host=host, port=port, db=db, password=password, decode_responses=True)
+            self.client = redis.Redis(host=host, port=port, db=db, password=password)
             self.client.ping()
             print("Connected to Redis successfully.")
         except redis.RedisError as e:
@@ -16,11 +94,10 @@ class RedisClient:
     def set(self, key: str, value: Any, expire: Optional[int] = None) -> bool:
         """
         Stores a key-value pair in Redis. Optionally set an expiration time (in seconds).
-        Value will be stored as a JSON string.
+        Value will be encoded with the codec of the key's namespace.
         """
         try:
-            json_value = json.dumps(value)
-            self.client.set(name=key, value=json_value, ex=expire)
+            self.client.set(name=key, value=self.codecs.encode(key, value), ex=expire)
             return True
         except redis.RedisError as e:
             print(f"faled to set key in redis: {e}")
@@ -28,28 +105,120 @@ class RedisClient:
 
     def get(self, key: str) -> Optional[Any]:
         """
-        Retrieves a value by key from Redis. Returns the parsed JSON object or None if not found.
+        Retrieves a value by key from Redis. Returns the decoded value or None if not found.
         """
         try:
             value = self.client.get(name=key)
             if value is None:
                 return None
-            return json.loads(value)
-        except (redis.RedisError, json.JSONDecodeError) as e:
+            return self.codecs.decode(value)
+        except (redis.RedisError, CodecError) as e:
             print(f"failed to get key from redis: {e}")
             return None
     
+    def set_if_absent(self, key: str, value: Any, expire: Optional[int] = None) -> bool:
+        """
+        Stores a key-value pair only if the key does not exist yet (SET NX), so it can be used as a lock.
+        Returns True if the key was set.
+        """
+        try:
+            return bool(self.client.set(name=key, value=self.codecs.encode(key, value), ex=expire, nx=True))
+        except redis.RedisError as e:
+            print(f"failed to set key in redis: {e}")
+            return False
+
     def delete(self, key: str) -> bool:
         """
         Delete value of key from redis.
         """
         try:
-            self.client.delete(*key)
+            self.client.delete(key)
             return True
         except redis.RedisError as e:
             print(f"failed to delete key from redis: {e}")
             return False
 
+    def ttl(self, key: str) -> int:
+        """
+        Returns the remaining time to live of a key in seconds,
+        -1 if the key has no expiration and -2 if it does not exist.
+        """
+        try:
+            return self.client.ttl(key)
+        except redis.RedisError as e:
+            print(f"failed to get ttl from redis: {e}")
+            return -2
+
+    def mget(self, keys: List[str]) -> List[Optional[Any]]:
+        """
+        Retrieves the values of several keys in one round trip. Missing keys are None.
+        """
+        if not keys:
+            return []
+        try:
+            return [_loads(self.codecs, value) for value in self.client.mget(keys)]
+        except redis.RedisError as e:
+            print(f"failed to get keys from redis: {e}")
+            return [None] * len(keys)
+
+    def mset(self, values: Dict[str, Any]) -> bool:
+        """
+        Stores several key-value pairs atomically (MSET), without expiration.
+        """
+        if not values:
+            return True
+        try:
+            self.client.mset({key: self.codecs.encode(key, value) for key, value in values.items()})
+            return True
+        except redis.RedisError as e:
+            print(f"failed to set keys in redis: {e}")
+            return False
+
+    def set_many(self, values: Dict[str, Any], expire: Union[int, Dict[str, Optional[int]], None] = None) -> bool:
+        """
+        Stores several key-value pairs in one round trip. expire is either one expiration time
+        (in seconds) for every key or a dict of per-key expiration times.
+        """
+        if not values:
+            return True
+        try:
+            with self.pipeline() as batch:
+                for key, value in values.items():
+                    batch.set(key, value, _expire_for(expire, key))
+            return True
+        except redis.RedisError as e:
+            print(f"failed to set keys in redis: {e}")
+            return False
+
+    def delete_many(self, keys: List[str]) -> int:
+        """
+        Deletes several keys at once. Returns the number of keys deleted.
+        """
+        if not keys:
+            return 0
+        try:
+            return self.client.delete(*keys)
+        except redis.RedisError as e:
+            print(f"failed to delete keys from redis: {e}")
+            return 0
+
+    @contextmanager
+    def pipeline(self, transaction: bool = False):
+        """
+        Yields a RedisBatch whose commands are sent in one round trip when the block exits.
+        Unlike the other methods, Redis errors are raised.
+        """
+        with self.client.pipeline(transaction=transaction) as pipe:
+            batch = RedisBatch(pipe, self.codecs)
+            yield batch
+            batch._finish(pipe.execute())
+
+    def transaction(self):
+        """
+        Like pipeline(), but the commands are executed atomically (MULTI/EXEC).
+        """
+        return self.pipeline(transaction=True)
+
     def count_keys_with_prefix(self, prefix: str) -> int:
         """
         Count the number of keys in Redis that start with a specific prefix using SCAN.
@@ -71,23 +240,221 @@ class RedisClient:
     def get_values_with_prefix(self, prefix: str) -> list:
         """
         Returns a list of all values from Redis where keys start with the given prefix.
+        Keys are found with SCAN and read with pipelined MGETs.
         """
         try:
-            values = []
-            cursor = 0
-            pattern = f"{prefix}*"
-            while True:
-                cursor, keys = self.client.scan(cursor=cursor, match=pattern, count=100)
-                for key in keys:
-                    value = self.get(key)
-                    if value is not None:
-                        values.append({"key": key, "data": json.loads(value)})
-                if cursor == 0:
-                    break
-            return values
+            keys = list(self.client.scan_iter(match=f"{prefix}*", count=SCAN_COUNT))
+            with self.client.pipeline(transaction=False) as pipe:
+                for i in range(0, len(keys), MGET_CHUNK_SIZE):
+                    pipe.mget(keys[i:i + MGET_CHUNK_SIZE])
+                chunks = pipe.execute()
+            values = [value for chunk in chunks for value in chunk]
+            return [{"key": key.decode(), "data": _loads(self.codecs, value)}
+                    for key, value in zip(keys, values) if value is not None]
         except redis.RedisError as e:
             print(f"Failed to get values with prefix '{prefix}': {e}")
             return []
 
-redis_client = RedisClient(Config.REDIS_HOST, int(Config.REDIS_PORT), Config.REDIS_PASSWORD)
-# redis_client = RedisClient()
\ No newline at end of file
+
+class AsyncRedisClient:
+    """
+    Asynchronous counterpart of RedisClient backed by redis.asyncio and a
+    connection pool, for use from coroutines without blocking the event loop.
+    """
+
+    def __init__(self, host: str = 'localhost', port: int = 6379, password: Optional[str] = None, db: int = 0,
+                 max_connections: int = 50, codecs: Optional[CodecRegistry] = None):
+        self.codecs = codecs or DEFAULT_CODECS
+        self.pool = redis.asyncio.ConnectionPool(host=host, port=port, db=db, password=password,
+                                                 max_connections=max_connections)
+        self.client = redis.asyncio.Redis(connection_pool=self.pool)
+
+    async def ping(self) -> None:
+        """
+        Checks the connection to Redis.
+        """
+        try:
+            await self.client.ping()
+            print("Connected to Redis successfully.")
+        except redis.RedisError as e:
+            raise ConnectionError(f"Failed to connect to Redis: {e}")
+
+    async def aclose(self) -> None:
+        """
+        Closes all connections of the pool.
+        """
+        await self.pool.disconnect()
+
+    async def set(self, key: str, value: Any, expire: Optional[int] = None) -> bool:
+        """
+        Stores a key-value pair in Redis. Optionally set an expiration time (in seconds).
+        Value will be encoded with the codec of the key's namespace.
+        """
+        try:
+            await self.client.set(name=key, value=self.codecs.encode(key, value), ex=expire)
+            return True
+        except redis.RedisError as e:
+            print(f"faled to set key in redis: {e}")
+            return False
+
+    async def get(self, key: str) -> Optional[Any]:
+        """
+        Retrieves a value by key from Redis. Returns the decoded value or None if not found.
+        """
+        try:
+            value = await self.client.get(name=key)
+            if value is None:
+                return None
+            return self.codecs.decode(value)
+        except (redis.RedisError, CodecError) as e:
+            print(f"failed to get key from redis: {e}")
+            return None
+
+    async def set_if_absent(self, key: str, value: Any, expire: Optional[int] = None) -> bool:
+        """
+        Stores a key-value pair only if the key does not exist yet (SET NX), so it can be used as a lock.
+        Returns True if the key was set.
+        """
+        try:
+            return bool(await self.client.set(name=key, value=self.codecs.encode(key, value), ex=expire, nx=True))
+        except redis.RedisError as e:
+            print(f"failed to set key in redis: {e}")
+            return False
+
+    async def delete(self, key: str) -> bool:
+        """
+        Delete value of key from redis.
+        """
+        try:
+            await self.client.delete(key)
+            return True
+        except redis.RedisError as e:
+            print(f"failed to delete key from redis: {e}")
+            return False
+
+    async def ttl(self, key: str) -> int:
+        """
+        Returns the remaining time to live of a key in seconds,
+        -1 if the key has no expiration and -2 if it does not exist.
+        """
+        try:
+            return await self.client.ttl(key)
+        except redis.RedisError as e:
+            print(f"failed to get ttl from redis: {e}")
+            return -2
+
+    async def mget(self, keys: List[str]) -> List[Optional[Any]]:
+        """
+        Retrieves the values of several keys in one round trip. Missing keys are None.
+        """
+        if not keys:
+            return []
+        try:
+            return [_loads(self.codecs, value) for value in await self.client.mget(keys)]
+        except redis.RedisError as e:
+            print(f"failed to get keys from redis: {e}")
+            return [None] * len(keys)
+
+    async def mset(self, values: Dict[str, Any]) -> bool:
+        """
+        Stores several key-value pairs atomically (MSET), without expiration.
+        """
+        if not values:
+            return True
+        try:
+            await self.client.mset({key: self.codecs.encode(key, value) for key, value in values.items()})
+            return True
+        except redis.RedisError as e:
+            print(f"failed to set keys in redis: {e}")
+            return False
+
+    async def set_many(self, values: Dict[str, Any], expire: Union[int, Dict[str, Optional[int]], None] = None) -> bool:
+        """
+        Stores several key-value pairs in one round trip. expire is either one expiration time
+        (in seconds) for every key or a dict of per-key expiration times.
+        """
+        if not values:
+            return True
+        try:
+            async with self.pipeline() as batch:
+                for key, value in values.items():
+                    batch.set(key, value, _expire_for(expire, key))
+            return True
+        except redis.RedisError as e:
+            print(f"failed to set keys in redis: {e}")
+            return False
+
+    async def delete_many(self, keys: List[str]) -> int:
+        """
+        Deletes several keys at once. Returns the number of keys deleted.
+        """
+        if not keys:
+            return 0
+        try:
+            return await self.client.delete(*keys)
+        except redis.RedisError as e:
+            print(f"failed to delete keys from redis: {e}")
+            return 0
+
+    @asynccontextmanager
+    async def pipeline(self, transaction: bool = False):
+        """
+        Yields a RedisBatch whose commands are sent in one round trip when the block exits.
+        Unlike the other methods, Redis errors are raised.
+        """
+        async with self.client.pipeline(transaction=transaction) as pipe:
+            batch = RedisBatch(pipe, self.codecs)
+            yield batch
+            batch._finish(await pipe.execute())
+
+    def transaction(self):
+        """
+        Like pipeline(), but the commands are executed atomically (MULTI/EXEC).
+        """
+        return self.pipeline(transaction=True)
+
+    async def count_keys_with_prefix(self, prefix: str) -> int:
+        """
+        Count the number of keys in Redis that start with a specific prefix using SCAN.
+        """
+        try:
+            count = 0
+            async for _ in self.client.scan_iter(match=f"{prefix}*", count=100):
+                count += 1
+            return count
+        except redis.RedisError as e:
+            print(f"Failed to count keys with prefix '{prefix}': {e}")
+            return 0
+
+    async def get_values_with_prefix(self, prefix: str) -> list:
+        """
+        Returns a list of all values from Redis where keys start with the given prefix.
+        Keys are found with SCAN and read with pipelined MGETs.
+        """
+        try:
+            keys = [key async for key in self.client.scan_iter(match=f"{prefix}*", count=SCAN_COUNT)]
+            async with self.client.pipeline(transaction=False) as pipe:
+                for i in range(0, len(keys), MGET_CHUNK_SIZE):
+                    pipe.mget(keys[i:i + MGET_CHUNK_SIZE])
+                chunks = await pipe.execute()
+            values = [value for chunk in chunks for value in chunk]
+            return [{"key": key.decode(), "data": _loads(self.codecs, value)}
+                    for key, value in zip(keys, values) if value is not None]
+        except redis.RedisError as e:
+            print(f"Failed to get values with prefix '{prefix}': {e}")
+            return []
+
+async_redis_client = AsyncRedisClient(Config.REDIS_HOST, int(Config.REDIS_PORT), Config.REDIS_PASSWORD)
+
+_redis_client = None
+
+
+def __getattr__(name: str):
+    # The synchronous client connects (and pings) on first use only, as the FastAPI app
+    # and the job worker use async_redis_client
+    global _redis_client
+    if name == "redis_client":
+        if _redis_client is None:
+            _redis_client = RedisClient(Config.REDIS_HOST, int(Config.REDIS_PORT), Config.REDIS_PASSWORD)
+        return _redis_client
+    raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
\ No newline at end of file
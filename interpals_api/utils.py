@@ -1,3 +1,4 @@
+import inspect
 import re
 from typing import Optional, Union, List, Type, Any
 from enum import Enum
@@ -25,6 +26,7 @@ def validate_enum_list(
     if values is None:
         return valid_values
 
+    values = [val.value if isinstance(val, Enum) else val for val in values]
     for val in values:
         if val not in valid_values:
             raise ValueError(f"Invalid {value_name}: {val}. Must be one of {valid_values}")
@@ -37,3 +39,12 @@ def validate_enum_value(value: Any, enum_class: Type[Enum]):
     except ValueError:
         valid_values = [e.value for e in enum_class]
         raise ValueError(f"Invalid value '{value}'. Allowed values: {valid_values}")
+
+async def maybe_await(value):
+    """
+    Awaits value if it is awaitable, so that both sync stores (RedisClient,
+    MemoryStore) and async ones can be used from coroutines.
+    """
+    if inspect.isawaitable(value):
+        return await value
+    return value